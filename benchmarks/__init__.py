@@ -0,0 +1 @@
+"""Benchmarks of sudoku-py, run with `python -m benchmarks.run`."""
@@ -0,0 +1,127 @@
+"""Build the puzzle corpora used by the benchmarks.
+
+The corpora are checked in under `benchmarks/corpora`, one puzzle per line, so benchmark runs of
+different versions time the same puzzles even if the generator changes. Run this module to
+rebuild them (every corpus is generated from a fixed seed):
+
+    python -m benchmarks.corpora
+"""
+import argparse
+from pathlib import Path
+from random import Random
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sudoku_py import Generator, Puzzle, Solver
+
+CORPORA_DIR = Path(__file__).parent / "corpora"
+
+# Well known puzzles that are slow for backtracking solvers (anti brute force, AI Escargot,
+# Golden Nugget, ...), all with a unique solution
+ADVERSARIAL = [
+    "..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9",
+    "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    "........3..1..56...9..4..7......9.5.7.......8.5.4.2....8..2..9...35..1..6........",
+    "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    "..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97..",
+]
+
+
+def build_easy(n: int, seed: int) -> List[Puzzle]:
+    """Puzzles of order 3 with most cells given, solved by filling singles alone."""
+    generator = Generator(order=3, difficulty=1)
+    return list(generator.spawn_many(n, workers=1, base_seed=seed))
+
+
+def build_hard(n: int, seed: int) -> List[Puzzle]:
+    """Puzzles of order 3 with a unique solution and as few cells given as digging allows."""
+    generator = Generator(order=3, method="dig")
+    return list(generator.spawn_many(n, workers=1, base_seed=seed))
+
+
+def build_adversarial(n: int, seed: int) -> List[Puzzle]:
+    """Well known puzzles built to be slow for backtracking solvers."""
+    return [Puzzle.from_line(line) for line in ADVERSARIAL[:n]]
+
+
+def build_multiple(n: int, seed: int) -> List[Puzzle]:
+    """Puzzles of order 3 with between 2 and 20 solutions.
+
+    Every puzzle is a dug puzzle with given cells removed until it has more than one solution.
+    """
+    generator = Generator(order=3, method="dig")
+    solver = Solver()
+    rng = Random(seed)
+    puzzles = []
+    for puzzle in generator.spawn_many(4 * n, workers=1, base_seed=seed):
+        given = [index for index, element in enumerate(puzzle.data) if element]
+        rng.shuffle(given)
+        for index in given[:3]:
+            puzzle[index] = 0
+            n_solutions = solver.count_solutions(puzzle, limit=21)
+            if n_solutions > 1:
+                break
+        if 2 <= n_solutions <= 20:
+            puzzles.append(puzzle)
+        if len(puzzles) == n:
+            break
+    return puzzles
+
+
+def build_order2(n: int, seed: int) -> List[Puzzle]:
+    """Puzzles of order 2 (4x4), half with few and half with most cells given."""
+    hard = Generator(order=2, method="dig").spawn_many(n // 2, workers=1, base_seed=seed)
+    easy = Generator(order=2, difficulty=2).spawn_many(n - n // 2, workers=1, base_seed=seed)
+    return [*hard, *easy]
+
+
+# Name -> (builder, number of puzzles, seed)
+BUILDERS: Dict[str, Tuple[Callable[[int, int], List[Puzzle]], int, int]] = {
+    "easy": (build_easy, 200, 1),
+    "hard": (build_hard, 100, 2),
+    "adversarial": (build_adversarial, len(ADVERSARIAL), 3),
+    "multiple": (build_multiple, 50, 4),
+    "order2": (build_order2, 200, 5),
+}
+
+
+def load_corpus(name: str, corpora_dir: Path = CORPORA_DIR) -> List[Puzzle]:
+    """Load a corpus written by `build_corpora`."""
+    with open(corpora_dir / f"{name}.txt", "r", encoding="utf-8") as corpus_file:
+        return [Puzzle.from_line(line) for line in corpus_file if line.strip()]
+
+
+def build_corpora(corpora_dir: Path = CORPORA_DIR, names: Optional[List[str]] = None):
+    """Generate corpora and write them to `corpora_dir`, one puzzle per line."""
+    corpora_dir.mkdir(parents=True, exist_ok=True)
+    for name in names or BUILDERS:
+        builder, n, seed = BUILDERS[name]
+        puzzles = builder(n, seed)
+        with open(corpora_dir / f"{name}.txt", "w", encoding="utf-8") as corpus_file:
+            corpus_file.writelines(puzzle.to_line() + "\n" for puzzle in puzzles)
+        print(f"{name}: {len(puzzles)} puzzles")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the benchmark corpora.")
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help=f"Corpora to rebuild, any of {', '.join(BUILDERS)} (all if not given).",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Directory to write corpora to (default is benchmarks/corpora).",
+        default=CORPORA_DIR,
+    )
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BUILDERS:
+            parser.error(f"unknown corpus {name!r}")
+    build_corpora(args.output, args.names)
+
+
+if __name__ == "__main__":
+    main()
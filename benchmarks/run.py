@@ -0,0 +1,464 @@
+"""Time the main operations of sudoku-py on the benchmark corpora.
+
+Every benchmark runs one operation over the puzzles of a corpus (see `benchmarks.corpora`) and
+reports its throughput, the percentiles of the latency of a single call, and the peak memory
+allocated while running it once over the corpus (measured in a separate pass, as tracing
+allocations slows everything down). Results are printed as a table, and can be written as JSON
+and compared against the results of a previous run:
+
+    python -m benchmarks.run --json results.json
+    python -m benchmarks.run --compare results.json
+
+The time to import the package and the modules loaded by the command line and worker processes
+is measured in fresh interpreters, and the run fails if it is over the budgets in
+`IMPORT_BUDGETS_MS`:
+
+    python -m benchmarks.run -k import
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sudoku_py import Generator, Puzzle, Solver
+from sudoku_py.branching import Brancher
+
+from .corpora import CORPORA_DIR, load_corpus
+
+# Callable timed as one sample, and the number of calls to the benchmarked operation it makes
+Sample = Tuple[Callable[[], Any], int]
+
+PERCENTILES = (50, 90, 99)
+
+# Module -> maximum median time to import it in a fresh interpreter, in milliseconds
+IMPORT_BUDGETS_MS = {
+    "sudoku_py": 10.0,
+    "sudoku_py.batch": 100.0,
+    "sudoku_py.__main__": 150.0,
+}
+
+# Run in a fresh interpreter, prints the import time in seconds and the peak memory in bytes
+_IMPORT_SCRIPT = """
+import sys, tracemalloc
+from time import perf_counter
+if sys.argv[2] == "memory":
+    tracemalloc.start()
+start = perf_counter()
+__import__(sys.argv[1])
+duration = perf_counter() - start
+print(duration, tracemalloc.get_traced_memory()[1])
+"""
+
+
+class Benchmark(NamedTuple):
+    """Operation timed over the puzzles of some corpora."""
+
+    name: str
+    corpora: Sequence[str]
+    # Puzzles of a corpus and command line arguments -> samples to time
+    build: Callable[[List[Puzzle], argparse.Namespace], List[Sample]]
+    # Puzzles of a corpus and command line arguments -> search nodes (guesses) of each puzzle
+    nodes: Optional[Callable[[List[Puzzle], argparse.Namespace], List[int]]] = None
+
+
+def _solver(args: argparse.Namespace, **options) -> Solver:
+    options = {"branching": args.branching, "value_order": args.value_order, **options}
+    return Solver(loops=args.loops, backend=args.backend, **options)
+
+
+def _solve(**options) -> Callable[..., List[Sample]]:
+    # `options` override the branching strategy given on the command line
+    def build(puzzles: List[Puzzle], args: argparse.Namespace) -> List[Sample]:
+        solver = _solver(args, **options)
+        return [(lambda puzzle=puzzle: solver(puzzle), 1) for puzzle in puzzles]
+
+    return build
+
+
+def _count_nodes(limit: Optional[int] = 1, **options) -> Callable[..., List[int]]:
+    def count(puzzles: List[Puzzle], args: argparse.Namespace) -> List[int]:
+        solver = _solver(args, **options)
+        return [solver.solve(puzzle, limit=limit).stats.guesses for puzzle in puzzles]
+
+    return count
+
+
+def _solve_all(puzzles: List[Puzzle], args: argparse.Namespace) -> List[Sample]:
+    solver = _solver(args)
+    return [(lambda puzzle=puzzle: solver(puzzle, all_solutions=True), 1) for puzzle in puzzles]
+
+
+def _fill_singles(puzzles: List[Puzzle], args: argparse.Namespace) -> List[Sample]:
+    rules = ("naked_singles", "hidden_singles")
+    return [(lambda puzzle=puzzle: Solver.fill_singles(puzzle, rules), 1) for puzzle in puzzles]
+
+
+def _get_options(puzzles: List[Puzzle], args: argparse.Namespace) -> List[Sample]:
+    # One sample gets the options of every empty cell of a puzzle
+    samples = []
+    for puzzle in puzzles:
+        empty = puzzle.get_empty_indices()
+        if not empty:
+            continue
+        samples.append(
+            (lambda puzzle=puzzle, empty=empty: [puzzle.get_options(i) for i in empty], len(empty))
+        )
+    return samples
+
+
+def _repeated(method: str, repeat: int) -> Callable[..., List[Sample]]:
+    # Fast operations are called `repeat` times per sample, so the timer overhead is negligible
+    def build(puzzles: List[Puzzle], args: argparse.Namespace) -> List[Sample]:
+        calls = [getattr(puzzle, method) for puzzle in puzzles]
+        return [(lambda call=call: [call() for _ in range(repeat)], repeat) for call in calls]
+
+    return build
+
+
+def _spawn(method: str) -> Callable[..., List[Sample]]:
+    # The puzzles of the corpus only set the order, every sample spawns one puzzle from a seed
+    def build(puzzles: List[Puzzle], args: argparse.Namespace) -> List[Sample]:
+        generator = Generator(order=puzzles[0].order, method=method, loops=args.loops)
+        n = min(len(puzzles), args.spawns)
+        return [(lambda i=i: generator.spawn(rng_seed=i), 1) for i in range(n)]
+
+    return build
+
+
+BENCHMARKS = [
+    Benchmark(
+        "Solver.__call__", ["easy", "hard", "adversarial", "order2"], _solve(), _count_nodes()
+    ),
+    Benchmark(
+        "Solver.__call__[mrv_degree]",
+        ["hard", "adversarial"],
+        _solve(branching="mrv_degree"),
+        _count_nodes(branching="mrv_degree"),
+    ),
+    Benchmark(
+        "Solver.__call__[lcv]",
+        ["hard", "adversarial"],
+        _solve(value_order="lcv"),
+        _count_nodes(value_order="lcv"),
+    ),
+    Benchmark(
+        "Solver.__call__[mrv_degree,lcv]",
+        ["hard", "adversarial"],
+        _solve(branching="mrv_degree", value_order="lcv"),
+        _count_nodes(branching="mrv_degree", value_order="lcv"),
+    ),
+    Benchmark(
+        "Solver.__call__[restarts]",
+        ["hard", "adversarial"],
+        _solve(restarts=10, rng_seed=0),
+        _count_nodes(restarts=10, rng_seed=0),
+    ),
+    Benchmark(
+        "Solver.__call__[all_solutions]", ["multiple"], _solve_all, _count_nodes(limit=None)
+    ),
+    Benchmark("Solver.fill_singles", ["easy", "hard"], _fill_singles),
+    Benchmark("Puzzle.get_options", ["easy", "hard", "order2"], _get_options),
+    Benchmark("Puzzle.is_valid", ["easy", "hard", "order2"], _repeated("is_valid", 10)),
+    Benchmark("Puzzle.copy", ["hard", "order2"], _repeated("copy", 100)),
+    Benchmark("Generator.spawn[mask]", ["easy", "order2"], _spawn("mask")),
+    Benchmark("Generator.spawn[dig]", ["easy", "order2"], _spawn("dig")),
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Get the `q`th percentile of sorted values (nearest rank)."""
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def run_benchmark(samples: List[Sample], repeat: int) -> Dict[str, Any]:
+    """Time samples `repeat` times over, then measure the peak memory of a single pass.
+
+    Args:
+        samples: Callables to time, with the number of calls they make.
+        repeat: Number of passes over the samples.
+
+    Returns:
+        Number of calls, throughput (calls per second), latency of a call in microseconds (mean,
+        percentiles and maximum), and peak memory in KiB.
+    """
+    latencies = []
+    n_calls = 0
+    elapsed = 0.0
+    for _ in range(repeat):
+        for call, calls in samples:
+            start = perf_counter()
+            call()
+            duration = perf_counter() - start
+            elapsed += duration
+            n_calls += calls
+            latencies.append(duration / calls)
+    latencies.sort()
+
+    tracemalloc.start()
+    for call, _ in samples:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "n_calls": n_calls,
+        "throughput": n_calls / elapsed if elapsed else 0.0,
+        "latency_us": {
+            "mean": 1e6 * elapsed / n_calls,
+            **{f"p{q}": 1e6 * percentile(latencies, q) for q in PERCENTILES},
+            "max": 1e6 * latencies[-1],
+        },
+        "peak_memory_kib": peak / 1024,
+    }
+    return result
+
+
+def time_import(module: str, repeat: int) -> Dict[str, Any]:
+    """Import a module in `repeat` fresh interpreters, then once more to measure peak memory.
+
+    Returns:
+        Results in the same format as `run_benchmark`, with the budget of the module.
+    """
+
+    def measure(mode: str) -> Tuple[float, int]:
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SCRIPT, module, mode],
+            cwd=Path(__file__).parent.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        duration, peak = output.stdout.split()
+        return float(duration), int(peak)
+
+    latencies = sorted(measure("time")[0] for _ in range(repeat))
+    _, peak = measure("memory")
+    elapsed = sum(latencies)
+    return {
+        "n_calls": repeat,
+        "throughput": repeat / elapsed if elapsed else 0.0,
+        "latency_us": {
+            "mean": 1e6 * elapsed / repeat,
+            **{f"p{q}": 1e6 * percentile(latencies, q) for q in PERCENTILES},
+            "max": 1e6 * latencies[-1],
+        },
+        "peak_memory_kib": peak / 1024,
+        "budget_us": 1000 * IMPORT_BUDGETS_MS[module],
+    }
+
+
+def over_budget(report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Get the results with a budget whose median latency is above it."""
+    return [
+        result
+        for result in report["results"]
+        if "budget_us" in result and result["latency_us"]["p50"] > result["budget_us"]
+    ]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every selected benchmark and collect the results with details of the machine."""
+    corpora = {}
+    results = []
+    for module in IMPORT_BUDGETS_MS:
+        name = f"import {module}"
+        if args.filter and not any(part in name for part in args.filter):
+            continue
+        result = {"name": name, "corpus": "-", "n_puzzles": 0}
+        result.update(time_import(module, max(args.repeat, 5)))
+        results.append(result)
+        _print_result(result, sys.stderr)
+
+    for benchmark in BENCHMARKS:
+        if args.filter and not any(part in benchmark.name for part in args.filter):
+            continue
+        for corpus in benchmark.corpora:
+            if corpus not in corpora:
+                corpora[corpus] = load_corpus(corpus, args.corpora)[: args.limit]
+            samples = benchmark.build(corpora[corpus], args)
+            result = {"name": benchmark.name, "corpus": corpus, "n_puzzles": len(samples)}
+            result.update(run_benchmark(samples, args.repeat))
+            if benchmark.nodes is not None:
+                nodes = sorted(benchmark.nodes(corpora[corpus], args))
+                result["nodes"] = {
+                    "mean": sum(nodes) / max(len(nodes), 1),
+                    "max": nodes[-1] if nodes else 0,
+                }
+            results.append(result)
+            _print_result(result, sys.stderr)
+
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "branching": args.branching,
+            "value_order": args.value_order,
+            "loops": args.loops,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def _print_result(result: Dict[str, Any], stream, baseline: Optional[Dict[str, Any]] = None):
+    latency = result["latency_us"]
+    line = (
+        f"{result['name']:<32} {result['corpus']:<12} {result['throughput']:>12.1f}/s "
+        f"p50 {latency['p50']:>10.2f}us p99 {latency['p99']:>10.2f}us "
+        f"peak {result['peak_memory_kib']:>9.1f}KiB"
+    )
+    if "nodes" in result:
+        line += f" nodes {result['nodes']['mean']:>8.1f}"
+    if baseline is not None:
+        # Ratio of latencies, above 1 is slower than the baseline
+        line += f"  x{latency['p50'] / baseline['latency_us']['p50']:.2f} p50"
+        line += f"  x{result['peak_memory_kib'] / max(baseline['peak_memory_kib'], 1e-9):.2f} mem"
+        if "nodes" in result and "nodes" in baseline:
+            line += f"  x{result['nodes']['mean'] / max(baseline['nodes']['mean'], 1e-9):.2f} nodes"
+    print(line, file=stream)
+
+
+def compare(report: Dict[str, Any], baseline_report: Dict[str, Any], stream=sys.stdout):
+    """Print results next to their ratio to the results of a previous run."""
+    baseline = {(result["name"], result["corpus"]): result for result in baseline_report["results"]}
+    revision = baseline_report["meta"].get("revision")
+    date = baseline_report["meta"]["date"]
+    print(f"Compared with {revision or 'baseline'} ({date}):", file=stream)
+    for result in report["results"]:
+        _print_result(result, stream, baseline.get((result["name"], result["corpus"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sudoku-py.")
+    parser.add_argument(
+        "-k",
+        "--filter",
+        type=str,
+        nargs="*",
+        help="Only run benchmarks with a name containing any of these strings.",
+    )
+    parser.add_argument(
+        "--json",
+        type=Path,
+        help="Write the results as JSON to this path ('-' for stdout).",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        help="JSON results of a previous run to compare against.",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        help="Number of timed passes over each corpus (default is 3).",
+        default=3,
+    )
+    parser.add_argument(
+        "-n",
+        "--limit",
+        type=int,
+        help="Maximum number of puzzles used from each corpus.",
+    )
+    parser.add_argument(
+        "--spawns",
+        type=int,
+        help="Number of puzzles generated by the generator benchmarks (default is 20).",
+        default=20,
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=Solver.backends,
+        help="Search strategy for Solver (default is checkpoint).",
+        default="checkpoint",
+    )
+    parser.add_argument(
+        "--branching",
+        type=str,
+        choices=Brancher.cell_strategies,
+        help="Cell selection strategy of Solver, where a benchmark doesn't set it (default is "
+        "mrv).",
+        default="mrv",
+    )
+    parser.add_argument(
+        "--value-order",
+        type=str,
+        choices=[order for order in Brancher.value_orders if order != "random"],
+        help="Order Solver tries values in, where a benchmark doesn't set it (default is "
+        "descending).",
+        default="descending",
+    )
+    parser.add_argument(
+        "-l",
+        "--loops",
+        type=int,
+        help="Maximum number of loops for Solver (default value is 10000).",
+        default=10000,
+    )
+    parser.add_argument(
+        "--corpora",
+        type=Path,
+        help="Directory of the corpora (default is benchmarks/corpora).",
+        default=CORPORA_DIR,
+    )
+    args = parser.parse_args()
+
+    # Puzzles that exhaust the loops are timed like any other
+    warnings.simplefilter("ignore")
+
+    start = time.time()
+    report = run(args)
+    print(f"Ran {len(report['results'])} benchmarks in {time.time() - start:.1f}s", file=sys.stderr)
+
+    if args.json is not None:
+        text = json.dumps(report, indent=2)
+        if str(args.json) == "-":
+            print(text)
+        else:
+            args.json.write_text(text + "\n", encoding="utf-8")
+
+    if args.compare is not None:
+        baseline_report = json.loads(args.compare.read_text(encoding="utf-8"))
+        compare(report, baseline_report, sys.stderr if str(args.json) == "-" else sys.stdout)
+
+    failed = over_budget(report)
+    for result in failed:
+        print(
+            f"{result['name']} is over budget: p50 {result['latency_us']['p50'] / 1000:.1f}ms > "
+            f"{result['budget_us'] / 1000:.1f}ms",
+            file=sys.stderr,
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,9 @@ setup(
     author_email='blakejamescook@gmail.com',
     url='https://github.com/BlakeJC94/sudoku-py',
     python_requires=">=3.7",
+    extras_require={
+        'numpy': ['numpy'],
+    },
     entry_points={
         'console_scripts': ['sudoku=sudoku_py.__main__:main'],
     }
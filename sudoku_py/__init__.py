@@ -1,6 +1,37 @@
-from .puzzle import Puzzle
-from .solver import Solver
-from .generator import Generator
-from .logger import setup_logging
+"""Generate and solve sudoku puzzles.
 
-setup_logging()
+Submodules are imported on first access to the names exported here, so importing the package is
+cheap and leaves the logging configuration of the host application alone (the `sudoku` command
+sets up logging itself, see `sudoku_py.logger`).
+"""
+from importlib import import_module
+
+# Not taken from `typing`, which alone costs more to import than the rest of this module
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .puzzle import Puzzle
+    from .solver import Solver
+    from .generator import Generator
+    from .logger import setup_logging
+
+# Exported name -> submodule defining it
+_EXPORTS = {
+    "Puzzle": ".puzzle",
+    "Solver": ".solver",
+    "Generator": ".generator",
+    "setup_logging": ".logger",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
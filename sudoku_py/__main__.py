@@ -1,12 +1,20 @@
 """Main entrypoint for sudoku-py from the command line."""
 import argparse
-from pathlib import Path
-from math import ceil, log10
-from typing import Optional
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+from warnings import warn
 
 from .generator import Generator
 from .solver import Solver
+from .propagation import Propagator
+from .branching import Brancher
 from .puzzle import Puzzle
+from .parallel import count_solutions, iter_solutions
+from .batch import read_puzzle_lines, solve_batch, write_batch
+from .corpus import CorpusWriter, is_corpus
+from .render import PuzzleWriter
+from .exceptions import UnsolvedWarning
+from .logger import setup_logging
 
 
 def main():
@@ -38,9 +46,51 @@ def main():
         "-o",
         "--output",
         type=str,
-        help="Output file path (print outputs to stdout if not given).",
+        help="Output file path (print outputs to stdout if not given). Generated puzzles and "
+        "batch results are packed in a single binary corpus file if its suffix is .sdkc.",
         required=False,
     )
+    parser.add_argument(
+        "-f",
+        "--format",
+        type=str,
+        choices=PuzzleWriter.formats,
+        help="Text format of generated puzzles and solutions written to an output file (default "
+        "is grid, line writes one puzzle per line).",
+        required=False,
+        default="grid",
+    )
+
+    parser.add_argument(
+        "--serve",
+        type=str,
+        metavar="ADDRESS",
+        help="Answer solve, count, and generate requests written as JSON lines to a Unix socket "
+        "at this path, or a TCP socket at [HOST:]PORT (on 127.0.0.1 if no host is given), see "
+        "sudoku_py.server.",
+        required=False,
+    )
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        help="Number of requests the server answers at a time before it stops reading requests "
+        "(default is 16 per worker).",
+        required=False,
+    )
+
+    parser.add_argument(
+        "-b",
+        "--batch",
+        action="store_true",
+        help="Solve every puzzle in input, written one per line ('-' reads from stdin) or packed "
+        "in a .sdkc corpus file.",
+    )
+
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="Fill singles of many puzzles at once with numpy before searching (batch mode).",
+    )
 
     # if all-solutions, generate all solutions (stdout or file)
     parser.add_argument(
@@ -49,6 +99,11 @@ def main():
         action="store_true",
         help="Whether to solve for all solutions for an input.",
     )
+    parser.add_argument(
+        "--count",
+        action="store_true",
+        help="Print the number of solutions of an input rather than the solutions.",
+    )
     parser.add_argument(
         "-l",
         "--loops",
@@ -57,6 +112,84 @@ def main():
         required=False,
         default=10000,
     )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds Solver may search a puzzle before giving up (no limit by default).",
+        required=False,
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        help="Number of guesses Solver may make on a puzzle before giving up (no limit by "
+        "default).",
+        required=False,
+    )
+    parser.add_argument(
+        "-n",
+        "--number",
+        type=int,
+        help="Number of puzzles to generate (default is 1).",
+        required=False,
+        default=1,
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of worker processes when generating or batch solving many puzzles (default "
+        "is number of CPUs), or searching for all solutions of a puzzle (default is 1).",
+        required=False,
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=Solver.backends,
+        help="Search strategy for Solver (default is checkpoint).",
+        required=False,
+        default="checkpoint",
+    )
+    parser.add_argument(
+        "--rules",
+        type=str,
+        nargs="*",
+        choices=Propagator.available_rules,
+        help="Deduction rules applied by Solver before guessing (default is naked_singles "
+        "hidden_singles).",
+        required=False,
+        default=["naked_singles", "hidden_singles"],
+    )
+    parser.add_argument(
+        "--branching",
+        type=str,
+        choices=Brancher.cell_strategies,
+        help="Strategy selecting the cell Solver guesses (default is mrv).",
+        required=False,
+        default="mrv",
+    )
+    parser.add_argument(
+        "--value-order",
+        type=str,
+        choices=Brancher.value_orders,
+        help="Order Solver tries the values of a guessed cell in (default is descending).",
+        required=False,
+        default="descending",
+    )
+    parser.add_argument(
+        "--restarts",
+        type=int,
+        help="Number of backtracks before Solver starts over with random tie-breaks, doubled at "
+        "every restart (never restarts by default).",
+        required=False,
+    )
+    parser.add_argument(
+        "--method",
+        type=str,
+        choices=Generator.methods,
+        help="Generation method for Generator (default is mask, dig guarantees a unique solution).",
+        required=False,
+        default="mask",
+    )
     parser.add_argument(
         "-s",
         "--seed",
@@ -66,13 +199,49 @@ def main():
     )
 
     args = parser.parse_args()
+    setup_logging()
 
-    if args.input is None:
-        generator = Generator(difficulty=args.difficulty, loops=args.loops)
-        _generate_puzzle(generator, output=args.output, rng_seed=args.seed)
+    solver = Solver(
+        loops=args.loops,
+        backend=args.backend,
+        rules=args.rules,
+        timeout=args.timeout,
+        max_nodes=args.max_nodes,
+        branching=args.branching,
+        value_order=args.value_order,
+        restarts=args.restarts,
+        rng_seed=args.seed,
+    )
+    if args.serve is not None:
+        _serve(args.serve, solver, args.workers, args.max_pending, args.difficulty, args.method)
+    elif args.input is None:
+        generator = Generator(difficulty=args.difficulty, loops=args.loops, method=args.method)
+        if args.number > 1:
+            _generate_puzzles(
+                generator,
+                args.number,
+                args.workers,
+                output=args.output,
+                rng_seed=args.seed,
+                output_format=args.format,
+            )
+        else:
+            _generate_puzzle(
+                generator, output=args.output, rng_seed=args.seed, output_format=args.format
+            )
+    elif args.batch:
+        _solve_batch(args.input, solver, args.workers, args.output, args.vectorized)
+    elif args.count:
+        _count_solutions(args.input, solver, args.workers)
     else:
-        solver = Solver(loops=args.loops)
-        _solve_puzzle(args.input, solver, args.all_solutions, args.output)
+        _solve_puzzle(
+            args.input,
+            solver,
+            args.all_solutions,
+            args.output,
+            args.format,
+            workers=args.workers,
+        )
 
     return 0
 
@@ -82,44 +251,166 @@ def _solve_puzzle(
     solver: Solver,
     all_solutions: bool,
     output: Optional[str],
+    output_format: str = "grid",
+    workers: Optional[int] = None,
 ) -> int:
     puzzle = Puzzle(puzzle_input)
-    solved = solver(puzzle, all_solutions=all_solutions)
+    if all_solutions and _in_parallel(solver, workers):
+        solutions = iter_solutions(puzzle, solver, workers)
+    elif all_solutions:
+        solutions = solver.iter_solutions(puzzle)
+    else:
+        solutions = iter([solver(puzzle)])
+    if all_solutions:
+        solutions = _warn_if_partial(solutions, solver)
 
-    # TODO refactor once `yield` is used `Solver.__call__`
-    if isinstance(solved, Puzzle):
-        solved = [solved]
+    # Solutions are written as they are found, the first is held back until it is known whether
+    # more than one solution needs to be numbered
+    first_solution = next(solutions, None)
+    if first_solution is None:
+        if solver.exhausted:
+            warn(
+                "Unsolved, the search ran out of budget (loops, timeout, or max_nodes).",
+                UnsolvedWarning,
+            )
+        else:
+            warn("Unsolved, the puzzle has no solution.", UnsolvedWarning)
+        first_solution = puzzle
 
+    second_solution = next(solutions, None)
+    if second_solution is None:
+        _write_puzzle(first_solution, output, output_format=output_format)
+        return 0
+
+    solutions = chain([first_solution, second_solution], solutions)
     if output is not None:
-        output = Path(output)
-
-    n_solutions = len(solved)
-    for i, solution in enumerate(solved, start=1):
-        if output:
-            if n_solutions > 1:
-                index_name = "_" + str(i).zfill(ceil(log10(n_solutions)))
-                output = list(output.parts[:-1]) + [
-                    output.stem + index_name + output.suffix
-                ]
-                output = Path("".join(output))
-
-            solution.save(output)
-        else:
-            if n_solutions > 1:
-                print(f"Solution {i} :")
-            print(solution)
+        _write_puzzles(solutions, output, output_format)
+        return 0
+
+    for i, solution in enumerate(solutions, start=1):
+        _write_puzzle(solution, output, i, label="Solution")
 
     return 0
 
 
+def _warn_if_partial(solutions: Iterator[Puzzle], solver: Solver) -> Iterator[Puzzle]:
+    # Warns once the solutions run out, as only then is it known whether a budget ran out first
+    n_solutions = 0
+    for n_solutions, solution in enumerate(solutions, start=1):
+        yield solution
+    if n_solutions and solver.exhausted:
+        warn(
+            f"Found {n_solutions} solutions before the search ran out of budget (loops, "
+            "timeout, or max_nodes), there may be more.",
+            UnsolvedWarning,
+        )
+
+
+def _count_solutions(puzzle_input: str, solver: Solver, workers: Optional[int]) -> int:
+    puzzle = Puzzle(puzzle_input)
+    if _in_parallel(solver, workers):
+        n_solutions = count_solutions(puzzle, solver, workers)
+    else:
+        n_solutions = solver.count_solutions(puzzle, limit=None)
+
+    if solver.exhausted:
+        warn(
+            f"Counted {n_solutions} solutions before the search ran out of budget (loops, "
+            "timeout, or max_nodes), there may be more.",
+            UnsolvedWarning,
+        )
+    print(n_solutions)
+    return 0
+
+
+def _in_parallel(solver: Solver, workers: Optional[int]) -> bool:
+    # The search tree of a single puzzle is only split between processes when asked for
+    return workers is not None and workers > 1 and solver.backend != "dlx"
+
+
+def _serve(
+    address: str,
+    solver: Solver,
+    workers: Optional[int],
+    max_pending: Optional[int],
+    difficulty: int,
+    method: str,
+) -> int:
+    # Imported here so that other commands don't pay for asyncio
+    from .server import SolverServer, parse_address
+
+    server = SolverServer(solver, workers, max_pending, difficulty=difficulty, method=method)
+    print(f"Serving on {address} with {server.workers} workers (Ctrl-C to stop)")
+    server.serve(parse_address(address))
+    return 0
+
+
+def _solve_batch(
+    puzzle_input: str,
+    solver: Solver,
+    workers: Optional[int],
+    output: Optional[str],
+    vectorized: bool = False,
+) -> int:
+    results = solve_batch(
+        read_puzzle_lines(puzzle_input), solver, workers=workers, vectorized=vectorized
+    )
+    write_batch(results, output)
+    return 0
+
+
+def _write_puzzle(
+    puzzle: Puzzle,
+    output: Optional[str],
+    index: Optional[int] = None,
+    label: str = "Puzzle",
+    output_format: str = "grid",
+):
+    if output is not None:
+        _write_puzzles([puzzle], output, output_format)
+    else:
+        if index is not None:
+            print(f"{label} {index} :")
+        print(puzzle)
+
+
+def _write_puzzles(puzzles: Iterable[Puzzle], output: str, output_format: str = "grid"):
+    # Every puzzle goes to the same file, as a packed corpus if its suffix is .sdkc
+    if is_corpus(output):
+        with CorpusWriter(output) as writer:
+            writer.write_many(puzzles)
+    else:
+        with PuzzleWriter(output, output_format) as writer:
+            writer.write_many(puzzles)
+
+
 def _generate_puzzle(
     generator: Generator,
     output: Optional[str] = None,
     rng_seed: Optional[int] = None,
+    output_format: str = "grid",
 ) -> int:
     puzzle = generator.spawn(rng_seed=rng_seed)
     if output is None:
         print(puzzle)
     else:
-        puzzle.save(output)
+        _write_puzzles([puzzle], output, output_format)
+    return 0
+
+
+def _generate_puzzles(
+    generator: Generator,
+    n: int,
+    workers: Optional[int] = None,
+    output: Optional[str] = None,
+    rng_seed: Optional[int] = None,
+    output_format: str = "grid",
+) -> int:
+    puzzles = generator.spawn_many(n, workers=workers, base_seed=rng_seed)
+    if output is not None:
+        _write_puzzles(puzzles, output, output_format)
+        return 0
+
+    for i, puzzle in enumerate(puzzles, start=1):
+        _write_puzzle(puzzle, output, i)
     return 0
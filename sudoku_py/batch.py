@@ -0,0 +1,178 @@
+"""Functions for solving many puzzles stored one per line."""
+import os
+import sys
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from .puzzle import Puzzle
+from .solver import Solver
+from .corpus import Corpus, CorpusWriter, is_corpus
+from .pool import worker_pool, worker_state
+from .exceptions import InvalidPuzzleError
+
+statuses = ["solved", "unsolvable", "exhausted", "invalid"]
+
+
+def read_puzzle_lines(input_path: Union[str, Path]) -> Iterator[str]:
+    """Stream puzzles from a file containing one puzzle per line.
+
+    Blank lines and lines starting with `#` are skipped. Corpus files (see `sudoku_py.corpus`)
+    are read as one line per puzzle.
+
+    Args:
+        input_path: Path to the file, or "-" to read from stdin.
+    """
+    if str(input_path) == "-":
+        yield from _iter_puzzle_lines(sys.stdin)
+        return
+
+    if is_corpus(input_path):
+        with Corpus(input_path) as corpus:
+            yield from corpus.iter_lines()
+        return
+
+    with open(input_path, "r", encoding="utf-8") as puzzle_file:
+        yield from _iter_puzzle_lines(puzzle_file)
+
+
+def _iter_puzzle_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def solve_line(line: str, solver: Solver) -> Tuple[str, str]:
+    """Solve a puzzle written on a single line.
+
+    Args:
+        line: Puzzle in the format read by `Puzzle.from_line`.
+        solver: Solver to use.
+
+    Returns:
+        Status (one of `statuses`) and the solution as a line, or the input line if unsolved.
+    """
+    try:
+        puzzle = Puzzle.from_line(line)
+    except (AssertionError, ValueError, InvalidPuzzleError):
+        return "invalid", line
+
+    result = solver.solve(puzzle)
+    if not result.solutions:
+        return result.status, line
+
+    return "solved", result.solutions[0].to_line()
+
+
+def solve_batch(
+    lines: Iterable[str],
+    solver: Optional[Solver] = None,
+    workers: int = 1,
+    chunksize: int = 256,
+    vectorized: bool = False,
+) -> Iterator[Tuple[str, str]]:
+    """Solve a stream of puzzles written one per line.
+
+    Puzzles are read from `lines` only as fast as they are solved, so arbitrarily long inputs can
+    be processed in constant memory.
+
+    Args:
+        lines: Puzzles in the format read by `Puzzle.from_line`.
+        solver: Solver to use (default settings if not given).
+        workers: Number of worker processes, puzzles are solved in the current process if 1.
+        chunksize: Number of puzzles sent to a worker at a time.
+        vectorized: Fill singles of each chunk of puzzles at once with numpy before searching
+            (see `sudoku_py.vectorized`).
+
+    Yields:
+        (status, line) pairs as returned by `solve_line`, in input order.
+    """
+    solver = solver or Solver()
+    lines = iter(lines)
+    if workers == 1:
+        while True:
+            chunk = list(islice(lines, chunksize))
+            if not chunk:
+                break
+            yield from _solve_lines(chunk, solver, vectorized)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with worker_pool(workers, (solver, vectorized)) as executor:
+        # Keep a bounded number of chunks in flight rather than submitting the whole input
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(lines, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_solve_chunk, chunk))
+
+            if not pending:
+                break
+
+            yield from pending.popleft().result()
+
+
+def write_batch(results: Iterable[Tuple[str, str]], output: Optional[Union[str, Path]] = None):
+    """Write (status, line) results as tab-separated "line<TAB>status" lines as they arrive.
+
+    If output is a corpus file (see `sudoku_py.corpus`), one puzzle is written per result
+    instead: the solution if solved, otherwise the input puzzle (empty if invalid).
+
+    Args:
+        results: Results of `solve_batch`.
+        output: Path of the output file (stdout if not given).
+    """
+    if output is not None and is_corpus(output):
+        _write_corpus(results, output)
+        return
+
+    output_file = sys.stdout if output is None else open(output, "w", encoding="utf-8")
+    try:
+        for status, line in results:
+            output_file.write(f"{line}\t{status}\n")
+    finally:
+        if output is not None:
+            output_file.close()
+
+
+def _write_corpus(results: Iterable[Tuple[str, str]], output: Union[str, Path]):
+    writer, n_invalid = None, 0
+    try:
+        for status, line in results:
+            cells = None
+            if status != "invalid":
+                cells = [0 if element == "." else int(element, 36) for element in line]
+
+            # The corpus takes the order of the first valid puzzle, invalid puzzles (and puzzles
+            # of another order) are written as empty puzzles of that order
+            if writer is None:
+                if cells is None:
+                    n_invalid += 1
+                    continue
+                writer = CorpusWriter(output, order=int(round(len(cells) ** 0.25)))
+                writer.write_many([bytes(len(cells))] * n_invalid)
+            if cells is None or len(cells) != writer.order**4:
+                cells = bytes(writer.order**4)
+            writer.write(cells)
+    finally:
+        if writer is None:
+            writer = CorpusWriter(output)
+        writer.close()
+
+
+def _solve_lines(lines: List[str], solver: Solver, vectorized: bool) -> List[Tuple[str, str]]:
+    if vectorized:
+        from .vectorized import solve_lines
+
+        return solve_lines(lines, solver)
+
+    return [solve_line(line, solver) for line in lines]
+
+
+def _solve_chunk(lines: List[str]) -> List[Tuple[str, str]]:
+    solver, vectorized = worker_state()
+    return _solve_lines(lines, solver, vectorized)
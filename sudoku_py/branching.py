@@ -0,0 +1,112 @@
+"""Branching heuristics choosing which cell to guess and in which order to try its values."""
+from random import Random
+from typing import List, Optional
+
+from .puzzle import Puzzle
+
+
+class Brancher:
+    """Selects the cell to guess from the candidates of every cell, and orders its values.
+
+    Candidates are bitmasks as in `Puzzle.get_candidates` (bit `v - 1` set if `v` is an option,
+    0 for filled cells). A cell with a single candidate is always selected first, as it needs no
+    guess.
+
+    Cell strategies:
+        mrv: First cell with the fewest candidates (minimum remaining values).
+        mrv_degree: Cell with the fewest candidates, ties broken by the largest number of empty
+            peers (the cell constraining the most others).
+
+    Value orders:
+        descending: Largest value first.
+        ascending: Smallest value first.
+        lcv: Least constraining value first, the value removing the fewest candidates from empty
+            peers, ties tried smallest value first.
+        random: Shuffled.
+
+    With an `rng`, ties between cells are broken at random, so that repeated searches (e.g.
+    randomized restarts) explore different trees.
+    """
+
+    cell_strategies = ["mrv", "mrv_degree"]
+    value_orders = ["descending", "ascending", "lcv", "random"]
+
+    def __init__(
+        self,
+        cells: str = "mrv",
+        values: str = "descending",
+        rng: Optional[Random] = None,
+    ):
+        """Constructor.
+
+        Args:
+            cells: Strategy selecting the cell to guess (one of `cell_strategies`).
+            values: Order in which values of the cell are tried (one of `value_orders`).
+            rng: Random number generator for random tie-breaks and the "random" value order
+                (ties are broken by cell index if not given).
+        """
+        assert (
+            cells in self.cell_strategies
+        ), f"Unknown cell strategy {cells}, expected one of {self.cell_strategies}."
+        assert (
+            values in self.value_orders
+        ), f"Unknown value order {values}, expected one of {self.value_orders}."
+        assert values != "random" or rng is not None, "The random value order requires `rng`."
+        self.cells = cells
+        self.values = values
+        self.rng = rng
+
+    def select(self, puzzle: Puzzle, candidates: List[int]) -> Optional[int]:
+        """Get the index of the cell to guess, or None if every cell is filled."""
+        if self.cells == "mrv" and self.rng is None:
+            return _first_min_cell(candidates)
+
+        peers, data = puzzle._tables.peers, puzzle.data
+        use_degree = self.cells == "mrv_degree"
+        rng = self.rng
+        best, best_score, n_ties = None, None, 0
+        for index, bits in enumerate(candidates):
+            if not bits:
+                continue
+            n_options = bin(bits).count("1")
+            if n_options == 1:
+                return index
+
+            # Fewer candidates first, then more empty peers
+            degree = sum(1 for peer in peers[index] if data[peer] == 0) if use_degree else 0
+            score = (n_options, -degree)
+            if best_score is None or score < best_score:
+                best, best_score, n_ties = index, score, 1
+            elif score == best_score and rng is not None:
+                # Reservoir sampling keeps each tied cell with equal probability
+                n_ties += 1
+                if rng.randrange(n_ties) == 0:
+                    best = index
+        return best
+
+    def order(self, puzzle: Puzzle, candidates: List[int], index: int) -> List[int]:
+        """Get the values of a cell in the order they should be tried."""
+        options = [i + 1 for i in range(puzzle.size) if candidates[index] >> i & 1]
+        if self.values == "descending":
+            options.reverse()
+        elif self.values == "lcv":
+            peer_candidates = [candidates[peer] for peer in puzzle._tables.peers[index]]
+            options.sort(
+                key=lambda value: sum(bits >> (value - 1) & 1 for bits in peer_candidates)
+            )
+        elif self.values == "random":
+            self.rng.shuffle(options)
+        return options
+
+
+def _first_min_cell(candidates: List[int]) -> Optional[int]:
+    """Get the index of the first empty cell with the fewest candidates, or None."""
+    index, min_options = None, None
+    for empty_index, bits in enumerate(candidates):
+        if bits:
+            n_options = bin(bits).count("1")
+            if min_options is None or n_options < min_options:
+                index, min_options = empty_index, n_options
+                if n_options == 1:
+                    break
+    return index
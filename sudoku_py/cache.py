@@ -0,0 +1,135 @@
+"""Cache of puzzle solutions shared by puzzles that are the same up to symmetry."""
+import shelve
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from .puzzle import Puzzle
+from .canonical import Transform, canonical_form
+
+
+class SolutionCache:
+    """Least recently used cache of solutions, keyed by the canonical form of the puzzles.
+
+    Solutions are stored for the canonical puzzle (see `canonical_form`), so a puzzle that is a
+    relabeled, reordered, or transposed version of a cached one is a hit, with the solutions
+    transformed back to match it. Puzzles above order 3 are only matched as given.
+
+    An optional on-disk store (a `shelve` file) keeps every entry across runs, and entries read
+    from it are brought back into memory. The cache is not shared between processes.
+    """
+
+    def __init__(self, maxsize: int = 1024, path: Optional[Union[str, Path]] = None):
+        """Constructor.
+
+        Args:
+            maxsize: Maximum number of puzzles kept in memory.
+            path: Path of the on-disk store (memory only if not given).
+        """
+        assert maxsize >= 1, "`maxsize` must be at least 1."
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        # canonical key -> (canonical solutions, whether they are all the solutions)
+        self._entries: "OrderedDict[str, Tuple[Tuple[bytes, ...], bool]]" = OrderedDict()
+        # puzzle cells -> (canonical key, transform), so repeated puzzles skip canonicalization
+        self._keys: "OrderedDict[bytes, Tuple[str, Optional[Transform]]]" = OrderedDict()
+        self._store = shelve.open(str(path)) if path is not None else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        return f"SolutionCache[n_puzzles={len(self)}, hits={self.hits}, misses={self.misses}]"
+
+    def __enter__(self) -> "SolutionCache":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the on-disk store, if any."""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def get(self, puzzle: Puzzle, all_solutions: bool = False) -> Optional[List[Puzzle]]:
+        """Get the cached solutions of a puzzle.
+
+        Args:
+            puzzle: Unsolved sudoku puzzle.
+            all_solutions: Whether every solution is needed, rather than one.
+
+        Returns:
+            Solutions of the puzzle (an empty list if it has none), or None if they are not
+            cached (or only some of them are, when `all_solutions` is set).
+        """
+        key, transform = self._lookup_key(puzzle)
+        entry = self._entries.get(key)
+        if entry is None and self._store is not None:
+            entry = self._store.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is None or (all_solutions and not entry[1]):
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        solutions, _ = entry
+        if not all_solutions:
+            solutions = solutions[:1]
+        typecode = puzzle.data.typecode
+        return [self._from_canonical(solution, typecode, transform) for solution in solutions]
+
+    def put(self, puzzle: Puzzle, solutions: List[Puzzle], complete: bool):
+        """Cache solutions of a puzzle.
+
+        Args:
+            puzzle: Unsolved sudoku puzzle.
+            solutions: Solutions found for the puzzle.
+            complete: Whether these are all the solutions of the puzzle.
+        """
+        key, transform = self._lookup_key(puzzle)
+        if transform is not None:
+            solutions = [transform.apply(solution) for solution in solutions]
+
+        entry = (tuple(solution.data.tobytes() for solution in solutions), complete)
+        self._remember(key, entry)
+        if self._store is not None:
+            self._store[key] = entry
+
+    def _remember(self, key: str, entry: Tuple[Tuple[bytes, ...], bool]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _lookup_key(self, puzzle: Puzzle) -> Tuple[str, Optional[Transform]]:
+        cells = puzzle.data.tobytes()
+        found = self._keys.get(cells)
+        if found is not None:
+            self._keys.move_to_end(cells)
+            return found
+
+        if puzzle.order <= 3:
+            canonical, transform = canonical_form(puzzle)
+            found = canonical.data.tobytes().hex(), transform
+        else:
+            found = cells.hex(), None
+
+        self._keys[cells] = found
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+        return found
+
+    @staticmethod
+    def _from_canonical(cells: bytes, typecode: str, transform: Optional[Transform]) -> Puzzle:
+        data = array(typecode)
+        data.frombytes(cells)
+        solution = Puzzle.from_trusted(data)
+        return transform.revert(solution) if transform is not None else solution
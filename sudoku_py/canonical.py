@@ -0,0 +1,390 @@
+"""Canonical forms of sudoku puzzles under the symmetries that preserve their solutions."""
+from itertools import permutations
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .puzzle import Puzzle
+
+
+class Transform(NamedTuple):
+    """Symmetry of a sudoku puzzle, relating puzzles that have the same solutions up to it.
+
+    Applying it optionally transposes the puzzle, then reorders rows and columns (within their
+    band/stack, and bands/stacks as a whole), then relabels the values.
+
+    Attributes:
+        transpose: Whether rows and columns are swapped first.
+        rows: Row of the (transposed) puzzle moved to each row.
+        cols: Column of the (transposed) puzzle moved to each column.
+        digits: New value of each value (`digits[0]` is 0).
+    """
+
+    transpose: bool
+    rows: Tuple[int, ...]
+    cols: Tuple[int, ...]
+    digits: Tuple[int, ...]
+
+    def apply(self, puzzle: Puzzle) -> Puzzle:
+        """Get the puzzle transformed by this symmetry."""
+        size, data, digits = len(self.rows), puzzle.data, self.digits
+        if self.transpose:
+            cells = [col * size + row for row in self.rows for col in self.cols]
+        else:
+            cells = [row * size + col for row in self.rows for col in self.cols]
+        return Puzzle.from_trusted([digits[data[index]] for index in cells])
+
+    def revert(self, puzzle: Puzzle) -> Puzzle:
+        """Get the puzzle that this symmetry transforms into the given one."""
+        size = len(self.rows)
+        values = [0] * len(self.digits)
+        for value, digit in enumerate(self.digits):
+            values[digit] = value
+
+        data = [0] * (size * size)
+        for new_row, row in enumerate(self.rows):
+            for new_col, col in enumerate(self.cols):
+                index = col * size + row if self.transpose else row * size + col
+                data[index] = values[puzzle.data[new_row * size + new_col]]
+
+        return Puzzle.from_trusted(data)
+
+
+def canonical_form(puzzle: Puzzle) -> Tuple[Puzzle, Transform]:
+    """Get the canonical form of a puzzle, shared by every puzzle it can be transformed into.
+
+    The canonical form is the transformed puzzle (see `Transform`) that comes first when listing
+    its cells row by row, with empty cells first and values relabeled in order of appearance.
+    Rows are placed one at a time, only keeping the transforms that give the smallest rows so
+    far. Columns (and stacks) that are still empty are kept together rather than tried in every
+    order, so sparse puzzles only explore a small part of the symmetry group.
+
+    Args:
+        puzzle: Sudoku puzzle of order 2 or 3, the number of symmetries grows too fast with the
+            order for larger puzzles.
+
+    Returns:
+        The canonical puzzle, and the transform from the input puzzle to it.
+    """
+    order, size = puzzle.order, puzzle.size
+    assert order <= 3, "Canonical forms are only supported for puzzles of order 2 or 3."
+
+    grids = []
+    for transpose in (False, True):
+        if transpose:
+            grids.append([puzzle.data[col::size] for col in range(size)])
+        else:
+            grids.append([puzzle.data[row * size : (row + 1) * size] for row in range(size)])
+
+    # Partial transforms giving the smallest rows so far: (transpose, rows, slots, labels)
+    all_stacks = ((tuple(range(order)), None),)
+    candidates = [(transpose, (), all_stacks, [0] * (size + 1)) for transpose in (0, 1)]
+    for level in range(size):
+        best, extended = None, []
+        for transpose, rows, slots, labels in candidates:
+            grid = grids[transpose]
+            for row in _next_rows(grid, rows, level, order):
+                if isinstance(slots[0], int):
+                    string, outcomes = _relabel_row(slots, grid[row], labels)
+                else:
+                    # Every way of getting the smallest row gives the same row, only list them
+                    # when it is at least as small as the best one
+                    string, outcomes = _row_string(slots, grid[row], labels, order), None
+                if best is not None and string > best:
+                    continue
+                if best is None or string < best:
+                    best, extended = string, []
+                if outcomes is None:
+                    _, outcomes = _arrange_row(slots, grid[row], labels, order)
+                for new_slots, new_labels in outcomes:
+                    extended.append((transpose, rows + (row,), new_slots, new_labels))
+        candidates = extended
+
+    transpose, rows, slots, labels = candidates[0]
+    cols = _flatten(slots, order)
+
+    # Values missing from the puzzle take the remaining labels in order
+    unused = iter(sorted(set(range(1, size + 1)) - set(labels)))
+    digits = tuple(label or next(unused) if value else 0 for value, label in enumerate(labels))
+
+    transform = Transform(bool(transpose), rows, tuple(cols), digits)
+    return transform.apply(puzzle), transform
+
+
+def _relabel_row(
+    cols: Tuple[int, ...], values: Sequence[int], labels: List[int]
+) -> Tuple[List[int], List[Tuple[Tuple[int, ...], List[int]]]]:
+    """Relabel a row once the order of every column is known."""
+    string, new_labels, next_label = [], None, max(labels) + 1
+    for col in cols:
+        value = values[col]
+        label = (new_labels or labels)[value]
+        if value and not label:
+            # First appearance of the value, copy labels only when needed
+            if new_labels is None:
+                new_labels = labels.copy()
+            new_labels[value] = label = next_label
+            next_label += 1
+        string.append(label)
+
+    return string, [(cols, new_labels or labels)]
+
+
+def _row_string(
+    slots: Tuple["_Slot", ...], values: Sequence[int], labels: List[int], order: int
+) -> List[int]:
+    """Get the smallest relabeled row that the remaining column orders give a row.
+
+    Values are distinct within a row, so the labels given to its new values do not change the
+    rest of the row, and following any one of the ways of getting the smallest cells is enough.
+    """
+    string, next_label = [], max(labels) + 1
+    for stacks, parts in slots:
+        if parts is not None:
+            for part in parts:
+                chunk, next_label = _part_string(part, values, labels, next_label)
+                string += chunk
+            continue
+
+        chunks = []
+        for stack in stacks:
+            part = range(stack * order, (stack + 1) * order)
+            chunks.append(_part_string(part, values, labels, 0)[0])
+
+        # Place the stack with the smallest cells first, labeling its new values from there
+        while chunks:
+            labeled = [_label_new(chunk, next_label) for chunk in chunks]
+            position = labeled.index(min(labeled))
+            string += labeled[position]
+            next_label += chunks.pop(position).count(-1)
+
+    return string
+
+
+def _part_string(
+    part: Sequence[int], values: Sequence[int], labels: List[int], next_label: int
+) -> Tuple[List[int], int]:
+    """Get the smallest relabeled cells of a part, new values are marked -1 if `next_label`
+    is 0."""
+    empty, labeled, new = 0, [], 0
+    for col in part:
+        value = values[col]
+        if not value:
+            empty += 1
+        elif labels[value]:
+            labeled.append(labels[value])
+        else:
+            new += 1
+
+    chunk = [0] * empty + sorted(labeled)
+    if next_label:
+        chunk += range(next_label, next_label + new)
+        return chunk, next_label + new
+    return chunk + [-1] * new, 0
+
+
+def _label_new(chunk: List[int], next_label: int) -> List[int]:
+    """Give labels from `next_label` to the new values of a chunk (marked -1)."""
+    labeled = []
+    for label in chunk:
+        if label < 0:
+            label, next_label = next_label, next_label + 1
+        labeled.append(label)
+    return labeled
+
+
+def _flatten(slots: Tuple["_Slot", ...], order: int) -> Tuple[int, ...]:
+    if isinstance(slots[0], int):
+        return slots
+
+    cols = []
+    for stacks, parts in slots:
+        if parts is None:
+            parts = [range(stack * order, (stack + 1) * order) for stack in stacks]
+        for part in parts:
+            cols.extend(part)
+    return tuple(cols)
+
+
+# Columns are arranged through "slots": either a group of stacks whose columns are all empty in
+# the rows placed so far, in any order, written `(stacks, None)`; or a single stack whose columns
+# are split into parts, written `((stack,), parts)`. Parts are either a single column or columns
+# that are all empty so far, in any order.
+_Slot = Tuple[Tuple[int, ...], Optional[Tuple[Tuple[int, ...], ...]]]
+_Outcome = Tuple[Tuple[_Slot, ...], List[int], int]
+
+
+def _arrange_row(
+    slots: Tuple[_Slot, ...], values: Sequence[int], labels: List[int], order: int
+) -> Tuple[List[int], List[Tuple[Tuple[_Slot, ...], List[int]]]]:
+    """Find the smallest relabeled row that the remaining column orders give a row.
+
+    Returns:
+        The smallest row, and the slots and labels of every way of getting it.
+    """
+    string = []
+    outcomes: List[_Outcome] = [((), labels, max(labels) + 1)]
+    for stacks, parts in slots:
+        best, extended = None, []
+        for built, state_labels, next_label in outcomes:
+            if parts is None:
+                chunk, results = _arrange_group(stacks, values, state_labels, next_label, order)
+            else:
+                chunk, results = _arrange_stack(stacks, parts, values, state_labels, next_label)
+            if best is not None and chunk > best:
+                continue
+            if best is None or chunk < best:
+                best, extended = chunk, []
+            extended.extend(
+                (built + new_slots, new_labels, new_next)
+                for new_slots, new_labels, new_next in results
+            )
+        string += best
+        outcomes = extended
+
+    # Switch to plain column orders once every column is placed
+    results = []
+    for new_slots, new_labels, _ in outcomes:
+        if all(parts is not None and len(parts) == order for _, parts in new_slots):
+            new_slots = _flatten(new_slots, order)
+        results.append((new_slots, new_labels))
+    return string, results
+
+
+def _arrange_group(
+    stacks: Tuple[int, ...],
+    values: Sequence[int],
+    labels: List[int],
+    next_label: int,
+    order: int,
+) -> Tuple[List[int], List[_Outcome]]:
+    """Order a group of stacks that are empty so far, and the columns within each of them."""
+    empty = tuple(
+        stack
+        for stack in stacks
+        if not any(values[col] for col in range(stack * order, (stack + 1) * order))
+    )
+    chunk = [0] * (order * len(empty))
+    if len(empty) > 1:
+        prefix = ((empty, None),)
+    elif len(empty) == 1:
+        prefix = (((empty[0],), (tuple(range(empty[0] * order, (empty[0] + 1) * order)),)),)
+    else:
+        prefix = ()
+
+    # Place the other stacks one at a time, trying every stack that gives the smallest cells
+    others = tuple(stack for stack in stacks if stack not in empty)
+    outcomes = [(prefix, others, labels, next_label)]
+    for _ in range(len(stacks) - len(empty)):
+        best, extended = None, []
+        for built, remaining, state_labels, state_next in outcomes:
+            for stack in remaining:
+                part = (tuple(range(stack * order, (stack + 1) * order)),)
+                stack_chunk, results = _arrange_stack(
+                    (stack,), part, values, state_labels, state_next
+                )
+                if best is not None and stack_chunk > best:
+                    continue
+                if best is None or stack_chunk < best:
+                    best, extended = stack_chunk, []
+                rest = tuple(other for other in remaining if other != stack)
+                extended.extend(
+                    (built + new_slots, rest, new_labels, new_next)
+                    for new_slots, new_labels, new_next in results
+                )
+        chunk += best
+        outcomes = extended
+
+    return chunk, [(built, new_labels, new_next) for built, _, new_labels, new_next in outcomes]
+
+
+def _arrange_stack(
+    stacks: Tuple[int, ...],
+    parts: Tuple[Tuple[int, ...], ...],
+    values: Sequence[int],
+    labels: List[int],
+    next_label: int,
+) -> Tuple[List[int], List[_Outcome]]:
+    """Order the columns within a stack, part by part."""
+    chunk = []
+    outcomes = [((), labels, next_label)]
+    for part in parts:
+        best, extended = None, []
+        for built, state_labels, state_next in outcomes:
+            part_chunk, results = _arrange_part(part, values, state_labels, state_next)
+            if best is not None and part_chunk > best:
+                continue
+            if best is None or part_chunk < best:
+                best, extended = part_chunk, []
+            extended.extend(
+                (built + new_parts, new_labels, new_next)
+                for new_parts, new_labels, new_next in results
+            )
+        chunk += best
+        outcomes = extended
+
+    return chunk, [
+        (((stacks, new_parts),), new_labels, new_next)
+        for new_parts, new_labels, new_next in outcomes
+    ]
+
+
+def _arrange_part(
+    part: Tuple[int, ...],
+    values: Sequence[int],
+    labels: List[int],
+    next_label: int,
+) -> Tuple[List[int], List[Tuple[Tuple[Tuple[int, ...], ...], List[int], int]]]:
+    """Order the columns of a part: empty cells first, then values already labeled, then new
+    values (in every order, as they give the same cells but different labels)."""
+    if len(part) == 1:
+        value = values[part[0]]
+        if value and not labels[value]:
+            labels = labels.copy()
+            labels[value] = next_label
+            next_label += 1
+        return [labels[value]], [((part,), labels, next_label)]
+
+    empty = tuple(col for col in part if values[col] == 0)
+    labeled = sorted(
+        (col for col in part if labels[values[col]]), key=lambda col: labels[values[col]]
+    )
+    new = [col for col in part if values[col] and not labels[values[col]]]
+
+    chunk = [0] * len(empty) + [labels[values[col]] for col in labeled]
+    chunk += range(next_label, next_label + len(new))
+    fixed = ((empty,) if empty else ()) + tuple((col,) for col in labeled)
+    outcomes = []
+    for ordered in permutations(new):
+        new_labels = labels.copy()
+        for offset, col in enumerate(ordered):
+            new_labels[values[col]] = next_label + offset
+        new_parts = fixed + tuple((col,) for col in ordered)
+        outcomes.append((new_parts, new_labels, next_label + len(new)))
+
+    return chunk, outcomes
+
+
+def _next_rows(
+    grid: List[Sequence[int]], rows: Tuple[int, ...], level: int, order: int
+) -> List[int]:
+    """Get the rows that can be moved to row `level` after the given ones.
+
+    Swapping two empty rows of a band, or two empty bands, leaves the puzzle unchanged, so only
+    the first empty row of a band and the first empty band are tried.
+    """
+    if level % order == 0:
+        used_bands = {row // order for row in rows}
+        bands = [band for band in range(order) if band not in used_bands]
+    else:
+        bands = [rows[level - level % order] // order]
+
+    next_rows, empty_band_seen = [], False
+    for band in bands:
+        band_rows = [row for row in range(band * order, (band + 1) * order) if row not in rows]
+        empty_rows = [row for row in band_rows if not any(grid[row])]
+        if len(empty_rows) == order:
+            if empty_band_seen:
+                continue
+            empty_band_seen = True
+        next_rows.extend(row for row in band_rows if row not in empty_rows[1:])
+
+    return next_rows
@@ -1,21 +1,35 @@
 """Classes and methods for saving checkpoints of sudoku puzzles."""
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Union
 
 from .puzzle import Puzzle
 from .exceptions import EmptyCheckpointer
 
 
 class Checkpointer:
-    """Save states of a Sudoku puzzle."""
+    """Save states of a Sudoku puzzle.
 
-    def __init__(self):
-        """Constructor."""
+    By default a copy of the puzzle is saved at every checkpoint. With `deltas`, only the state
+    at the last checkpoint is kept as a puzzle, and every checkpoint records the cells changed
+    since the one before it, so memory grows with the number of cells filled rather than with
+    the depth of the search times the size of the puzzle.
+    """
+
+    def __init__(self, deltas: bool = False):
+        """Constructor.
+
+        Args:
+            deltas: Whether to save the cells changed between checkpoints instead of copies.
+        """
+        self.deltas = deltas
         self.history = []
+        self._head = None  # puzzle state at the last checkpoint (delta mode)
 
     def __len__(self) -> int:
         return len(self.history)
 
-    def __getitem__(self, index: int) -> Tuple[Puzzle, int, List[int]]:
+    def __getitem__(
+        self, index: int
+    ) -> Tuple[Union[Puzzle, List[Tuple[int, int]]], int, List[int]]:
         return self.history[index]
 
     def __str__(self) -> str:
@@ -25,6 +39,9 @@ class Checkpointer:
         """Pops an element from options and guesses value at puzzle index, then creates checkpoint
         for a (puzzle, index, guess) triplet.
 
+        In delta mode, the saved puzzle is replaced by the (index, previous value) pairs of the
+        cells that changed since the previous checkpoint.
+
         Args:
             puzzle: Sudoku puzzle to stash.
             index: Cell index to make the guess.
@@ -37,23 +54,161 @@ class Checkpointer:
             len(options) >= 2
         ), "`Checkpointer.stash` requires an input with at least 2 options."
         guess = options.pop()
-        self.history.append((puzzle.copy(), index, options.copy()))
+        if not self.deltas:
+            self.history.append((puzzle.copy(), index, options.copy()))
+        elif self._head is None:
+            self._head = puzzle.copy()
+            self.history.append(([], index, options.copy()))
+        else:
+            head = self._head
+            changes = [
+                (cell, previous)
+                for cell, (previous, element) in enumerate(zip(head.data, puzzle.data))
+                if previous != element
+            ]
+            for cell, _ in changes:
+                head[cell] = puzzle.data[cell]
+            self.history.append((changes, index, options.copy()))
+
         puzzle[index] = guess
         return puzzle
 
     def pop(self) -> Puzzle:
-        """Remove and return last saved (puzzle, index, options) triplet.
+        """Restore the puzzle saved at the last checkpoint and guess its next option.
 
-        Equivalent to traversing another branch of the decision tree at the last bifurcation.
+        Equivalent to traversing another branch of the decision tree at the last bifurcation. The
+        checkpoint is removed once its last option is used.
 
         Returns:
-            Last saved (puzzle, index, options) triplet.
+            Puzzle saved at the last checkpoint, with the next guess made.
         """
         if len(self.history) == 0:
             raise EmptyCheckpointer("Attempted pop of empty Checkpointer")
 
-        puzzle, index, opts = self.history.pop()
-        if len(opts) == 1:
-            puzzle[index] = opts[0]
+        saved, index, options = self.history[-1]
+        last = len(options) == 1
+        if last:
+            self.history.pop()
+
+        if not self.deltas:
+            puzzle = saved if last else saved.copy()
+        else:
+            puzzle = self._head.copy()
+            if last:
+                self._restore_previous(saved)
 
+        puzzle[index] = options.pop()
         return puzzle
+
+    def saved_states(self) -> List[Tuple[Puzzle, int, List[int]]]:
+        """Get the (puzzle, index, options) saved at every checkpoint, oldest first.
+
+        In delta mode the puzzle at each checkpoint is rebuilt from the head by reverting the
+        changes recorded by later checkpoints. The puzzles are copies in delta mode and the saved
+        puzzles otherwise, so they must not be modified.
+        """
+        if not self.deltas:
+            return list(self.history)
+
+        states = []
+        if self._head is not None:
+            puzzle = self._head.copy()
+            for changes, index, options in reversed(self.history):
+                states.append((puzzle, index, options))
+                puzzle = puzzle.copy()
+                for cell, previous in changes:
+                    puzzle[cell] = previous
+        states.reverse()
+        return states
+
+    def _restore_previous(self, changes: List[Tuple[int, int]]):
+        """Revert the head puzzle to its state at the previous checkpoint (delta mode)."""
+        if len(self.history) == 0:
+            self._head = None
+            return
+
+        for cell, previous in changes:
+            self._head[cell] = previous
+
+
+class Trail:
+    """Record assignments made to a single working puzzle so they can be undone.
+
+    In-place alternative to `Checkpointer`: rather than saving a copy of the puzzle at every
+    guess, each checkpoint remembers how many assignments had been made when it was created, and
+    popping it resets every cell assigned since then.
+    """
+
+    def __init__(self, puzzle: Optional[Puzzle] = None):
+        """Constructor.
+
+        Args:
+            puzzle: Working puzzle that assignments are made to.
+        """
+        self.puzzle = puzzle
+        self.changes = []
+        self.history = []
+
+    def __len__(self) -> int:
+        return len(self.history)
+
+    def __getitem__(self, index: int) -> Tuple[int, int, List[int]]:
+        return self.history[index]
+
+    def __str__(self) -> str:
+        return f"Trail[n_checkpoints={len(self.history)}, n_changes={len(self.changes)}]"
+
+    def assign(self, puzzle: Puzzle, index: int, element: int):
+        """Set a value in the working puzzle and record the assignment."""
+        self.puzzle = puzzle
+        puzzle[index] = element
+        self.changes.append(index)
+
+    def undo(self, mark: int = 0):
+        """Empty every cell assigned after the first `mark` recorded assignments."""
+        changes = self.changes
+        while len(changes) > mark:
+            self.puzzle[changes.pop()] = 0
+
+    def reset(self):
+        """Undo every assignment and remove every checkpoint."""
+        self.undo()
+        self.history.clear()
+
+    def stash(self, puzzle: Puzzle, index: int, options: List[int]) -> Puzzle:
+        """Pops an element from options and guesses value at puzzle index, then creates a
+        checkpoint for the (assignments, index, options) triplet.
+
+        Args:
+            puzzle: Working puzzle.
+            index: Cell index to make the guess.
+            options: List of valid options to guess at cell index.
+
+        Returns:
+            Working puzzle with guess made at selected cell from an element of options.
+        """
+        assert (
+            len(options) >= 2
+        ), "`Trail.stash` requires an input with at least 2 options."
+        guess = options.pop()
+        self.history.append((len(self.changes), index, options))
+        self.assign(puzzle, index, guess)
+        return puzzle
+
+    def pop(self) -> Puzzle:
+        """Undo assignments back to the last checkpoint and guess its next option.
+
+        The checkpoint is removed once its last option is used.
+
+        Returns:
+            Working puzzle with the next guess made.
+        """
+        if len(self.history) == 0:
+            raise EmptyCheckpointer("Attempted pop of empty Trail")
+
+        mark, index, options = self.history[-1]
+        self.undo(mark)
+        if len(options) == 1:
+            self.history.pop()
+        self.assign(self.puzzle, index, options.pop())
+        return self.puzzle
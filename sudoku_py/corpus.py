@@ -0,0 +1,170 @@
+"""Packed binary files of many puzzles, read through `mmap` without parsing."""
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Union
+
+from .puzzle import Puzzle
+from .render import _DIGITS, bits_per_cell, pack_cells, packed_size, unpack_cells
+
+CORPUS_SUFFIX = ".sdkc"
+
+# Magic, format version, order, bits per cell, reserved, number of puzzles
+_HEADER = struct.Struct("<4sBBBxQ")
+_MAGIC = b"SDKC"
+_VERSION = 1
+
+
+def is_corpus(path: Union[str, Path]) -> bool:
+    """Check if a path names a corpus file, by its suffix."""
+    return Path(path).suffix == CORPUS_SUFFIX
+
+
+class CorpusWriter:
+    """Write puzzles of the same order to a corpus file, one fixed-size record per puzzle.
+
+    Records hold one value per cell, packed 4 bits per cell for orders up to 3 and one byte per
+    cell for larger puzzles, after a header recording the order and number of puzzles. The
+    number of puzzles is updated when the writer is closed.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        order: Optional[int] = None,
+        append: bool = False,
+    ):
+        """Constructor.
+
+        Args:
+            path: Path of the corpus file.
+            order: Order of the puzzles (taken from the first puzzle written if not given).
+            append: Whether to add puzzles to an existing corpus rather than replace it.
+        """
+        self.path = Path(path)
+        self.order = order
+        self.count = 0
+        self._file: BinaryIO
+        if append and self.path.exists():
+            self._file = open(self.path, "r+b")
+            magic, version, file_order, _, count = _HEADER.unpack(self._file.read(_HEADER.size))
+            assert magic == _MAGIC and version == _VERSION, f"{path} is not a corpus file."
+            assert order is None or file_order == order, "Corpus holds puzzles of another order."
+            self.order = file_order or order
+            self.count = count
+            self._file.seek(0, 2)
+        else:
+            self._file = open(self.path, "wb")
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, order or 0, 0, 0))
+
+        self._bits = bits_per_cell(self.order) if self.order else None
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def write(self, puzzle: Union[Puzzle, Sequence[int]]):
+        """Append a puzzle, given as a `Puzzle` or as a flat sequence of cells."""
+        cells = puzzle.data if isinstance(puzzle, Puzzle) else puzzle
+        if self._bits is None:
+            self.order = int(round(len(cells) ** 0.25))
+            self._bits = bits_per_cell(self.order)
+        assert len(cells) == self.order**4, f"Expected a puzzle of order {self.order}."
+
+        self._file.write(pack_cells(bytes(cells), self._bits))
+        self.count += 1
+
+    def write_many(self, puzzles: Iterable[Union[Puzzle, Sequence[int]]]) -> int:
+        """Append every puzzle, returning how many were written."""
+        start = self.count
+        for puzzle in puzzles:
+            self.write(puzzle)
+        return self.count - start
+
+    def close(self):
+        """Record the number of puzzles in the header and close the file."""
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        header = _HEADER.pack(_MAGIC, _VERSION, self.order or 0, self._bits or 0, self.count)
+        self._file.write(header)
+        self._file.close()
+
+
+class Corpus:
+    """Read-only access to the puzzles of a corpus file (see `CorpusWriter`).
+
+    The file is memory-mapped, so getting a puzzle reads its record at a fixed offset without
+    loading or parsing the rest of the file.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Constructor.
+
+        Args:
+            path: Path of the corpus file.
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as corpus_file:
+            header = corpus_file.read(_HEADER.size)
+            assert len(header) == _HEADER.size, f"{path} is not a corpus file."
+            magic, version, self.order, self.bits, self.count = _HEADER.unpack(header)
+            assert magic == _MAGIC and version == _VERSION, f"{path} is not a corpus file."
+            self._map = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.total = self.order**4
+        self.record_size = packed_size(self.order, self.bits) if self.count else 0
+        assert (
+            len(self._map) >= _HEADER.size + self.count * self.record_size
+        ), f"{path} is truncated."
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Puzzle, List[Puzzle]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        return Puzzle.from_trusted(array("B", self.get_cells(index)))
+
+    def __iter__(self) -> Iterator[Puzzle]:
+        for index in range(self.count):
+            yield self[index]
+
+    def __str__(self) -> str:
+        return f"Corpus[order={self.order}, n_puzzles={self.count}]"
+
+    def get_cells(self, index: int) -> bytes:
+        """Get the cells of a puzzle, one byte per cell listed row by row (0 if empty)."""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("Corpus index out of range")
+
+        start = _HEADER.size + index * self.record_size
+        return unpack_cells(self._map[start : start + self.record_size], self.total, self.bits)
+
+    def get_line(self, index: int) -> str:
+        """Get a puzzle in the one-line format of `Puzzle.to_line`."""
+        assert self.order <= 5, "Line format only supports orders up to 5."
+        return self.get_cells(index).translate(_DIGITS).decode("ascii")
+
+    def iter_lines(self) -> Iterator[str]:
+        """Yield every puzzle in the one-line format of `Puzzle.to_line`."""
+        for index in range(self.count):
+            yield self.get_line(index)
+
+    def close(self):
+        """Unmap the file."""
+        self._map.close()
@@ -0,0 +1,217 @@
+"""Exact cover solver (Knuth's Algorithm X with dancing links) for sudoku puzzles."""
+from time import perf_counter
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .puzzle import Puzzle
+from .tables import get_peer_tables
+
+
+class DancingLinks:
+    """Exact cover problem stored as a sparse matrix of circular doubly linked lists.
+
+    Node 0 is the root, nodes `1..n_columns` are column headers and the remaining nodes are the
+    ones of the matrix. Links are kept in flat lists indexed by node rather than in node objects.
+    """
+
+    def __init__(self, n_columns: int, rows: Sequence[Sequence[int]]):
+        """Constructor.
+
+        Args:
+            n_columns: Number of columns (constraints) to cover.
+            rows: Columns (numbered from 0) covered by each row.
+        """
+        n_nodes = 1 + n_columns + sum(len(row) for row in rows)
+        self.left = [0] * n_nodes
+        self.right = [0] * n_nodes
+        self.up = list(range(n_nodes))
+        self.down = list(range(n_nodes))
+        self.column = list(range(n_nodes))
+        self.row = [-1] * n_nodes
+        self.sizes = [0] * (n_columns + 1)
+
+        for node in range(n_columns + 1):
+            self.left[node] = node - 1 if node > 0 else n_columns
+            self.right[node] = node + 1 if node < n_columns else 0
+
+        node = n_columns + 1
+        for row_index, columns in enumerate(rows):
+            first = node
+            for column in columns:
+                header = column + 1
+                self.column[node] = header
+                self.row[node] = row_index
+                self.up[node] = self.up[header]
+                self.down[node] = header
+                self.down[self.up[header]] = node
+                self.up[header] = node
+                self.sizes[header] += 1
+                self.left[node] = node - 1 if node > first else first + len(columns) - 1
+                self.right[node] = node + 1 if node < first + len(columns) - 1 else first
+                node += 1
+
+        self.nodes = 0
+        self.exhausted = False
+
+    def _cover(self, header: int):
+        left, right, up, down, column, sizes = (
+            self.left,
+            self.right,
+            self.up,
+            self.down,
+            self.column,
+            self.sizes,
+        )
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                sizes[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, header: int):
+        left, right, up, down, column, sizes = (
+            self.left,
+            self.right,
+            self.up,
+            self.down,
+            self.column,
+            self.sizes,
+        )
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                sizes[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def _choose_column(self) -> int:
+        right, sizes = self.right, self.sizes
+        best, best_size = 0, None
+        header = right[0]
+        while header != 0:
+            if best_size is None or sizes[header] < best_size:
+                best, best_size = header, sizes[header]
+                if best_size <= 1:
+                    break
+            header = right[header]
+        return best
+
+    def search(
+        self, max_nodes: Optional[int] = None, deadline: Optional[float] = None
+    ) -> Iterator[List[int]]:
+        """Yield every exact cover as the list of selected rows.
+
+        Args:
+            max_nodes: Maximum number of rows to try before giving up (no limit if None), sets
+                `exhausted` if reached.
+            deadline: `time.perf_counter` value to give up at (no limit if None), checked every
+                256 rows tried, sets `exhausted` if reached.
+        """
+        right, down, column = self.right, self.down, self.column
+        self.nodes = 0
+        self.exhausted = False
+
+        # Row node selected at each level of the search
+        selected = []
+        while True:
+            if right[0] == 0:
+                yield [self.row[node] for node in selected]
+                node = None
+            else:
+                header = self._choose_column()
+                self._cover(header)
+                node = down[header]
+                if node == header:
+                    self._uncover(header)
+                    node = None
+
+            # Backtrack until a level with an untried row is found
+            while node is None:
+                if not selected:
+                    return
+                node = selected.pop()
+                header = column[node]
+                j = self.left[node]
+                while j != node:
+                    self._uncover(column[j])
+                    j = self.left[j]
+                node = down[node]
+                if node == header:
+                    self._uncover(header)
+                    node = None
+
+            if max_nodes is not None and self.nodes >= max_nodes:
+                self.exhausted = True
+                return
+            if deadline is not None and self.nodes & 255 == 0 and perf_counter() >= deadline:
+                self.exhausted = True
+                return
+            self.nodes += 1
+
+            selected.append(node)
+            j = right[node]
+            while j != node:
+                self._cover(column[j])
+                j = right[j]
+
+
+def build_exact_cover(puzzle: Puzzle) -> Tuple[DancingLinks, List[Tuple[int, int]]]:
+    """Express a sudoku puzzle as an exact cover problem.
+
+    Every placement of a value in an empty cell is a row, covering four constraints: the cell is
+    filled, and the value appears in its row, column, and block. Constraints already met by the
+    filled cells are left out.
+
+    Args:
+        puzzle: Sudoku puzzle.
+
+    Returns:
+        The exact cover problem, and the (index, value) placement of each of its rows.
+    """
+    tables = get_peer_tables(puzzle.order)
+    size, total = tables.size, tables.total
+
+    constraints = {}
+    placements = []
+    rows = []
+    for index, element in enumerate(puzzle.data):
+        if element != 0:
+            continue
+
+        row, col, block = tables.cell_units[index]
+        candidates = puzzle.get_candidates(index)
+        for value in range(size):
+            if candidates >> value & 1:
+                keys = (
+                    index,
+                    total + row * size + value,
+                    2 * total + col * size + value,
+                    3 * total + block * size + value,
+                )
+                rows.append([constraints.setdefault(key, len(constraints)) for key in keys])
+                placements.append((index, value + 1))
+
+    # A constraint that no placement can meet makes the puzzle unsolvable
+    for index, element in enumerate(puzzle.data):
+        if element == 0 and index not in constraints:
+            constraints[index] = len(constraints)
+    for unit_number, unit in enumerate(tables.units):
+        used = 0
+        for index in unit:
+            if puzzle.data[index]:
+                used |= 1 << (puzzle.data[index] - 1)
+        for value in range(size):
+            if not used >> value & 1:
+                constraints.setdefault(total + unit_number * size + value, len(constraints))
+
+    return DancingLinks(len(constraints), rows), placements
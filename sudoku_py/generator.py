@@ -1,10 +1,13 @@
 """Class for generating new puzzles"""
 import logging
-from random import randint, shuffle, seed
-from typing import Optional
+import os
+from random import Random, randint, shuffle, seed
+from typing import Iterator, Optional
 
 from .puzzle import Puzzle
 from .solver import Solver
+from .checkpointer import Trail
+from .pool import worker_pool, worker_state
 from .exceptions import InvalidPuzzleError, EmptyCheckpointer
 
 logger = logging.getLogger(__name__)
@@ -13,23 +16,33 @@ logger = logging.getLogger(__name__)
 class Generator:
     """Generates random Sudoku puzzles."""
 
+    methods = ["mask", "dig"]
+
     def __init__(
         self,
         order: int = 3,
         difficulty: int = 5,
         max_attempts: int = 10000,
         loops: int = 10000,
+        method: str = "mask",
     ):
         """Constructor.
 
         Args:
-            order: Order of puzzles to generate (2 or 3 supported).
+            order: Order of puzzles to generate (2 or more, e.g. 3 for 9x9 puzzles and 4 for
+                16x16 puzzles).
             difficulty: An integer between 1 (very easy) and 5 (very hard) controlling the number
                 of empty cells in generated puzzles.
             max_attempts: Number of random seeds to attempt.
             loops: Maximum number of solver loops top use for a random seed.
+            method: Either "mask" (solve a random seed and empty a random selection of cells) or
+                "dig" (fill a grid by randomised backtracking, then empty cells one at a time while
+                the puzzle keeps a unique solution).
         """
-        assert order in [2, 3], "Can only generate order 2 or order 3 puzzles."
+        assert method in self.methods, f"`method` must be one of {self.methods}."
+        self.method = method
+
+        assert order >= 2, "Can only generate puzzles of order 2 or more."
         self.order = int(order)
         self.total_elements = int(order) ** 4
 
@@ -46,7 +59,7 @@ class Generator:
         self.max_attempts = max_attempts
 
         assert loops > 0, "Max iterations should be larger than 0."
-        self.solver = Solver(loops=loops)
+        self.solver = Solver(loops=loops, backend="trail" if method == "dig" else "checkpoint")
 
     def spawn(self, rng_seed: Optional[int] = None) -> Puzzle:
         """Generate a random puzzle.
@@ -61,6 +74,9 @@ class Generator:
         if rng_seed is not None:
             seed(rng_seed)
 
+        if self.method == "dig":
+            return self.dig_holes(self.generate_solved_puzzle())
+
         random_puzzle = []  # TODO handle possibly unbound more elegantly
         for attempt in range(self.max_attempts):
             logger.info("attempt %d", attempt)
@@ -89,8 +105,40 @@ class Generator:
             for i in range(self.total_elements)
         ]
         shuffle(mask)
-        random_puzzle.data = [e * m for e, m in zip(random_puzzle.data, mask)]
-        return random_puzzle
+        return Puzzle.from_trusted([e * m for e, m in zip(random_puzzle.data, mask)])
+
+    def spawn_many(
+        self,
+        n: int,
+        workers: Optional[int] = None,
+        base_seed: Optional[int] = None,
+    ) -> Iterator[Puzzle]:
+        """Generate many random puzzles, spreading the work over a pool of processes.
+
+        Every puzzle is spawned from its own seed derived from `base_seed`, so the puzzles
+        generated for a given `base_seed` do not depend on the number of workers.
+
+        Args:
+            n: Number of puzzles to generate.
+            workers: Number of worker processes (number of CPUs if not given). Puzzles are
+                generated in the current process if this is 1.
+            base_seed: Seed for the sequence of per-puzzle seeds.
+
+        Yields:
+            Random sudoku puzzles, in order, as soon as each one is ready.
+        """
+        rng = Random(base_seed)
+        seeds = [rng.getrandbits(32) for _ in range(n)]
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or n <= 1:
+            for rng_seed in seeds:
+                yield self.spawn(rng_seed=rng_seed)
+            return
+
+        chunksize = max(1, min(64, n // (4 * workers)))
+        with worker_pool(workers, self) as executor:
+            yield from executor.map(_spawn_in_worker, seeds, chunksize=chunksize)
 
     def generate_random_puzzle(self) -> Puzzle:
         random_input = [
@@ -99,3 +147,106 @@ class Generator:
         ]
         shuffle(random_input)
         return Puzzle(random_input)
+
+    def generate_solved_puzzle(self) -> Puzzle:
+        """Fill an empty grid by backtracking over shuffled options."""
+        puzzle = Puzzle.from_trusted([0] * self.total_elements)
+        trail = Trail(puzzle)
+        while True:
+            try:
+                candidates = self.solver.propagator(puzzle, trail)
+            except InvalidPuzzleError:
+                trail.pop()
+                continue
+
+            index = self.solver.brancher.select(puzzle, candidates)
+            if index is None:
+                return puzzle
+
+            options = [i + 1 for i in range(self.order**2) if candidates[index] >> i & 1]
+            if len(options) == 1:
+                trail.assign(puzzle, index, options[0])
+                continue
+
+            shuffle(options)
+            trail.stash(puzzle, index, options)
+
+    def dig_holes(self, puzzle: Puzzle) -> Puzzle:
+        """Empty cells of a solved puzzle in random order, keeping each removal only if the
+        puzzle still has a unique solution.
+
+        Stops once the number of filled cells selected by `difficulty` is reached, or once every
+        cell has been tried (the puzzle is then minimal).
+
+        The uniqueness checks search in place on the partly dug grid, with a `Trail` kept for the
+        whole digging: each check is undone once answered, and the grid is only extended by the
+        removals that are kept, so it is never copied or solved again from the start.
+
+        Args:
+            puzzle: A solved sudoku puzzle.
+
+        Returns:
+            A puzzle with a unique solution.
+        """
+        puzzle = puzzle.copy()
+        trail = Trail(puzzle)
+        n_filled = self.total_elements
+        indices = list(range(self.total_elements))
+        shuffle(indices)
+        for index in indices:
+            if n_filled <= int(self.generated_elements):
+                break
+
+            element = puzzle[index]
+            puzzle[index] = 0
+            if self._has_other_solution(puzzle, trail, index, element):
+                puzzle[index] = element
+            else:
+                n_filled -= 1
+
+        return puzzle
+
+    def _has_other_solution(self, puzzle: Puzzle, trail: Trail, index: int, element: int) -> bool:
+        """Check if the puzzle has a solution where the cell at index is not element.
+
+        The puzzle is known to have a unique solution with element at index, so the only other
+        solutions that removing it can introduce have another option at that cell. Those options
+        are tried as the first checkpoint of a search made on `trail`, which is undone before
+        returning. Inconclusive searches (solver out of loops) count as another solution.
+        """
+        options = [option for option in puzzle.get_options(index) if option != element]
+        if not options:
+            return False
+
+        if len(options) == 1:
+            trail.assign(puzzle, index, options[0])
+        else:
+            trail.stash(puzzle, index, options)
+        try:
+            for _ in range(self.solver.loops):
+                try:
+                    candidates = self.solver.propagator(puzzle, trail)
+                except InvalidPuzzleError:
+                    try:
+                        trail.pop()
+                    except EmptyCheckpointer:
+                        return False
+                    continue
+
+                cell = self.solver.brancher.select(puzzle, candidates)
+                if cell is None:
+                    return True
+
+                options = self.solver.brancher.order(puzzle, candidates, cell)
+                if len(options) == 1:
+                    trail.assign(puzzle, cell, options[0])
+                else:
+                    # Options are popped from the end of the list
+                    trail.stash(puzzle, cell, options[::-1])
+            return True
+        finally:
+            trail.reset()
+
+
+def _spawn_in_worker(rng_seed: int) -> Puzzle:
+    return worker_state().spawn(rng_seed=rng_seed)
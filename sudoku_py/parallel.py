@@ -0,0 +1,240 @@
+"""Enumerate or count every solution of a puzzle across a process pool.
+
+The top of the decision tree is expanded in the calling process into independent sub-puzzles,
+which are solved by worker processes. A worker gives up on a sub-puzzle after a number of
+guesses and sends back the unexplored part of its tree as new sub-puzzles (see `Solver.split`),
+so a large subtree is shared out between idle workers rather than keeping a single one busy.
+"""
+import os
+from array import array
+from collections import deque
+from copy import copy
+from time import perf_counter
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from .puzzle import Puzzle
+from .solver import Solver
+from .pool import worker_pool, worker_state
+from .exceptions import InvalidPuzzleError
+
+
+class _TaskResult(NamedTuple):
+    """Outcome of searching a sub-puzzle in a worker."""
+
+    found: List[bytes]  # cells of the solutions found (empty if only counting)
+    count: int  # number of solutions found
+    rest: List[bytes]  # cells of the sub-puzzles left to search
+    loops: int
+    guesses: int
+
+
+def iter_solutions(
+    puzzle: Puzzle,
+    solver: Optional[Solver] = None,
+    workers: Optional[int] = None,
+    split_nodes: int = 256,
+) -> Iterator[Puzzle]:
+    """Yield every solution of a puzzle, searching sub-puzzles in parallel.
+
+    Solutions are yielded as workers find them, in no particular order. The budgets of the solver
+    (`loops`, `timeout`, and `max_nodes`) apply to the whole search, counting the work of every
+    worker. Each sub-puzzle is searched with what is left of them when it is sent, so workers
+    running at the same time can overrun them by up to that amount each. `solver.exhausted` is
+    set if a budget ran out before every solution was found, as for `Solver.iter_solutions`.
+
+    Args:
+        puzzle: Unsolved sudoku puzzle.
+        solver: Solver with the "checkpoint" or "trail" backend (default settings if not given).
+        workers: Number of worker processes (number of CPUs if not given).
+        split_nodes: Number of guesses a worker makes on a sub-puzzle before sending the rest
+            of its tree back to be shared out.
+    """
+    for cells, _ in _search(puzzle, solver, workers, split_nodes, count_only=False):
+        yield _from_cells(cells, puzzle)
+
+
+def count_solutions(
+    puzzle: Puzzle,
+    solver: Optional[Solver] = None,
+    workers: Optional[int] = None,
+    split_nodes: int = 256,
+) -> int:
+    """Count every solution of a puzzle in parallel, without keeping the solutions.
+
+    See `iter_solutions` for the arguments and budgets. The count is a lower bound if
+    `solver.exhausted` is set afterwards.
+    """
+    solutions = _search(puzzle, solver, workers, split_nodes, count_only=True)
+    return sum(count for _, count in solutions)
+
+
+def split_puzzle(
+    puzzle: Puzzle, solver: Solver, n_puzzles: int
+) -> Tuple[List[Puzzle], List[Puzzle]]:
+    """Expand the top of the decision tree of a puzzle, breadth first.
+
+    Cells are filled by `solver.propagator` and guessed with `solver.brancher` until there are
+    at least `n_puzzles` open branches or none are left.
+
+    Args:
+        puzzle: Unsolved sudoku puzzle.
+        solver: Solver whose deduction rules and branching strategy are used.
+        n_puzzles: Number of sub-puzzles to stop at.
+
+    Returns:
+        Sub-puzzles whose solutions are the solutions of the puzzle, and the solutions found
+        while expanding.
+    """
+    frontier = deque([puzzle.copy()])
+    solutions = []
+    while frontier and len(frontier) < n_puzzles:
+        branch = frontier.popleft()
+        try:
+            candidates = solver.propagator(branch)
+        except InvalidPuzzleError:
+            continue
+
+        index = solver.brancher.select(branch, candidates)
+        if index is None:
+            solutions.append(branch)
+            continue
+        frontier.extend(branch.branch(index, solver.brancher.order(branch, candidates, index)))
+    return list(frontier), solutions
+
+
+def _search(
+    puzzle: Puzzle,
+    solver: Optional[Solver],
+    workers: Optional[int],
+    split_nodes: int,
+    count_only: bool,
+) -> Iterator[Tuple[Optional[bytes], int]]:
+    """Yield (solution cells, 1) pairs, or (None, number of solutions) if `count_only`."""
+    solver = solver or Solver()
+    assert solver.backend != "dlx", "Parallel search requires the checkpoint or trail backend."
+    workers = workers or os.cpu_count() or 1
+    typecode = puzzle.data.typecode
+
+    sub_puzzles, solutions = split_puzzle(puzzle, solver, 4 * workers if workers > 1 else 1)
+    for solution in solutions:
+        yield (None, 1) if count_only else (solution.data.tobytes(), 1)
+
+    tasks = deque(sub_puzzle.data.tobytes() for sub_puzzle in sub_puzzles)
+    task_solver = _task_solver(copy(solver))
+    budget = _Budget(solver, split_nodes)
+    solver.exhausted = False
+    if workers == 1:
+        while tasks:
+            if budget.spent():
+                solver.exhausted = True
+                return
+            cells = tasks.popleft()
+            result = _search_task(task_solver, cells, budget.limits(), typecode, count_only)
+            yield from _task_solutions(result, count_only)
+            budget.add(result)
+            tasks.extend(result.rest)
+        return
+
+    # Only imported once a pool is needed, as in `worker_pool`
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    with worker_pool(workers, (task_solver, typecode, count_only)) as executor:
+        # One sub-puzzle per worker at a time, each given what is left of the budgets
+        pending = set()
+        while tasks or pending:
+            while tasks and len(pending) < workers:
+                if budget.spent():
+                    solver.exhausted = True
+                    tasks.clear()
+                    break
+                pending.add(executor.submit(_search_in_worker, tasks.popleft(), budget.limits()))
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                yield from _task_solutions(result, count_only)
+                budget.add(result)
+                tasks.extend(result.rest)
+
+
+class _Budget:
+    """Loops, guesses, and time used by every task of a search, against the solver's budgets."""
+
+    def __init__(self, solver: Solver, split_nodes: int):
+        self.solver = solver
+        self.split_nodes = split_nodes
+        self.deadline = None if solver.timeout is None else perf_counter() + solver.timeout
+        self.loops = 0
+        self.guesses = 0
+
+    def add(self, result: _TaskResult):
+        self.loops += result.loops
+        self.guesses += result.guesses
+
+    def spent(self) -> bool:
+        max_nodes = self.solver.max_nodes
+        return (
+            self.loops >= self.solver.loops
+            or (max_nodes is not None and self.guesses >= max_nodes)
+            or (self.deadline is not None and perf_counter() >= self.deadline)
+        )
+
+    def limits(self) -> Tuple[int, int, Optional[float]]:
+        """Get the loops, guesses, and seconds the next task may use (budgets not spent)."""
+        max_nodes = self.split_nodes
+        if self.solver.max_nodes is not None:
+            max_nodes = min(max_nodes, self.solver.max_nodes - self.guesses)
+        timeout = None if self.deadline is None else self.deadline - perf_counter()
+        return self.solver.loops - self.loops, max_nodes, timeout
+
+
+def _task_solutions(
+    result: _TaskResult, count_only: bool
+) -> Iterator[Tuple[Optional[bytes], int]]:
+    if count_only:
+        yield None, result.count
+    else:
+        for cells in result.found:
+            yield cells, 1
+
+
+def _task_solver(solver: Solver) -> Solver:
+    """Set up a copy of a solver to search sub-puzzles, without hooks or cache."""
+    solver.on_guess = solver.on_backtrack = None
+    solver.cache = None
+    return solver
+
+
+def _search_task(
+    solver: Solver,
+    cells: bytes,
+    limits: Tuple[int, int, Optional[float]],
+    typecode: str,
+    count_only: bool,
+) -> _TaskResult:
+    """Search a sub-puzzle until its tree is exhausted or the `limits` of `_Budget` run out."""
+    solver.loops, solver.max_nodes, solver.timeout = limits
+    data = array(typecode)
+    data.frombytes(cells)
+
+    found, count = [], 0
+    for solution in solver.iter_solutions(Puzzle.from_trusted(data)):
+        count += 1
+        if not count_only:
+            found.append(solution.data.tobytes())
+
+    rest = [branch.data.tobytes() for branch in solver.split()] if solver.can_resume else []
+    return _TaskResult(found, count, rest, solver.stats.loops, solver.stats.guesses)
+
+
+def _from_cells(cells: bytes, puzzle: Puzzle) -> Puzzle:
+    data = array(puzzle.data.typecode)
+    data.frombytes(cells)
+    return Puzzle.from_trusted(data)
+
+
+def _search_in_worker(cells: bytes, limits: Tuple[int, int, Optional[float]]) -> _TaskResult:
+    solver, typecode, count_only = worker_state()
+    return _search_task(solver, cells, limits, typecode, count_only)
@@ -0,0 +1,39 @@
+"""Process pools whose workers each hold an object set up once, such as a warm solver."""
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+_worker_state: Any = None
+
+
+def worker_pool(
+    workers: int, state: Any, setup: Optional[Callable[[Any], Any]] = None
+) -> "ProcessPoolExecutor":
+    """Create a pool of processes that each receive a copy of `state`.
+
+    Functions submitted to the pool get the copy of their worker process from `worker_state`, so
+    large objects are sent once per worker rather than with every task.
+
+    Args:
+        workers: Number of worker processes.
+        state: Object sent to every worker (must be picklable).
+        setup: Called as `setup(state)` in every worker when it starts, its result is kept as
+            the worker state instead (module-level function).
+    """
+    # Imported here so that importing sudoku_py modules doesn't pay for multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(state, setup)
+    )
+
+
+def worker_state() -> Any:
+    """Get the state of the current worker process, see `worker_pool`."""
+    return _worker_state
+
+
+def _init_worker(state: Any, setup: Optional[Callable[[Any], Any]]):
+    global _worker_state
+    _worker_state = state if setup is None else setup(state)
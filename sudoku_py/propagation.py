@@ -0,0 +1,287 @@
+"""Deduction rules for filling puzzle cells without guessing."""
+from typing import List, Optional, Sequence
+
+from .puzzle import Puzzle
+from .checkpointer import Trail
+from .stats import SolveStats
+from .tables import PeerTables, get_peer_tables
+from .exceptions import InvalidPuzzleError
+
+
+class Propagator:
+    """Fills cells of a puzzle in place by applying a selection of deduction rules.
+
+    Candidates of every cell are tracked as bitmasks (bit `v - 1` set if `v` is an option) for the
+    duration of a call. Filling a cell immediately removes its value from the candidates of its
+    peers, and rules that only eliminate candidates narrow them further.
+
+    Rules:
+        naked_singles: Fill cells that have a single candidate.
+        hidden_singles: Fill a value into the only cell of a row, column, or block where it fits.
+        naked_pairs: When two cells of a unit have the same two candidates, remove those
+            candidates from the rest of the unit.
+        hidden_pairs: When two values only fit in the same two cells of a unit, remove all other
+            candidates from those cells.
+        locked_candidates: When the candidates for a value in a block lie in a single row/column,
+            remove it from the rest of that row/column (pointing), and when the candidates for a
+            value in a row/column lie in a single block, remove it from the rest of that block
+            (claiming).
+    """
+
+    available_rules = [
+        "naked_singles",
+        "hidden_singles",
+        "naked_pairs",
+        "hidden_pairs",
+        "locked_candidates",
+    ]
+
+    def __init__(self, rules: Sequence[str] = ("naked_singles", "hidden_singles")):
+        """Constructor.
+
+        Args:
+            rules: Names of the rules to apply, cheaper rules are retried first whenever a rule
+                makes progress.
+        """
+        for rule in rules:
+            assert (
+                rule in self.available_rules
+            ), f"Unknown rule {rule}, expected one of {self.available_rules}."
+        self.rules = tuple(rules)
+        self._rule_methods = [getattr(self, "_" + rule) for rule in self.rules]
+
+    def __call__(
+        self,
+        puzzle: Puzzle,
+        trail: Optional[Trail] = None,
+        stats: Optional[SolveStats] = None,
+    ) -> List[int]:
+        """Apply rules to the puzzle until none of them make progress.
+
+        Args:
+            puzzle: Puzzle to fill in place.
+            trail: Trail to record filled cells on (cells are assigned directly if not given).
+            stats: Statistics to add the number of sweeps and of cells filled by each rule to.
+
+        Raises:
+            InvalidPuzzleError: If a cell or a value in a unit is left without any option.
+
+        Returns:
+            Remaining candidates of every cell as bitmasks (0 for filled cells).
+        """
+        tables = get_peer_tables(puzzle.order)
+        data = puzzle.data
+        candidates = [
+            puzzle.get_candidates(index) if element == 0 else 0
+            for index, element in enumerate(data)
+        ]
+        for index, element in enumerate(data):
+            if element == 0 and candidates[index] == 0:
+                raise InvalidPuzzleError("INDETERMENENT, restore previous guess")
+
+        state = _State(puzzle, trail, tables, candidates)
+        rule_methods = self._rule_methods
+        if stats is not None:
+            return self._apply_counted(state, stats)
+
+        rule_index = 0
+        while rule_index < len(rule_methods):
+            if rule_methods[rule_index](state):
+                rule_index = 0
+            else:
+                rule_index += 1
+
+        return candidates
+
+    def _apply_counted(self, state: "_State", stats: SolveStats) -> List[int]:
+        """Same as the loop of `__call__`, also counting sweeps and cells filled per rule."""
+        rule_methods = self._rule_methods
+        filled = [0] * len(rule_methods)
+        rule_index = 0
+        try:
+            while rule_index < len(rule_methods):
+                stats.sweeps += 1
+                n_filled = state.n_filled
+                progress = rule_methods[rule_index](state)
+                filled[rule_index] += state.n_filled - n_filled
+                if progress:
+                    rule_index = 0
+                else:
+                    rule_index += 1
+        finally:
+            if rule_index < len(rule_methods):
+                # Cells placed by the rule that found a contradiction
+                filled[rule_index] += state.n_filled - n_filled
+            for rule, n_filled in zip(self.rules, filled):
+                if n_filled:
+                    stats.filled[rule] = stats.filled.get(rule, 0) + n_filled
+
+        return state.candidates
+
+    @staticmethod
+    def _naked_singles(state: "_State") -> bool:
+        candidates = state.candidates
+        progress = False
+        for index in range(len(candidates)):
+            bits = candidates[index]
+            if bits and not bits & (bits - 1):
+                state.place(index, bits)
+                progress = True
+        return progress
+
+    @staticmethod
+    def _hidden_singles(state: "_State") -> bool:
+        candidates = state.candidates
+        data = state.puzzle.data
+        full = (1 << state.tables.size) - 1
+        progress = False
+        for unit in state.tables.units:
+            once, twice, placed = 0, 0, 0
+            for index in unit:
+                bits = candidates[index]
+                twice |= once & bits
+                once |= bits
+                if data[index]:
+                    placed |= 1 << (data[index] - 1)
+
+            if once | placed != full:
+                raise InvalidPuzzleError("INDETERMENENT, restore previous guess")
+
+            hidden = once & ~twice
+            while hidden:
+                bit = hidden & -hidden
+                hidden ^= bit
+                index = next((i for i in unit if candidates[i] & bit), None)
+                if index is None:
+                    # The only cell for this value was filled with another hidden single
+                    raise InvalidPuzzleError("INDETERMENENT, restore previous guess")
+                state.place(index, bit)
+                progress = True
+
+        return progress
+
+    @staticmethod
+    def _naked_pairs(state: "_State") -> bool:
+        candidates = state.candidates
+        progress = False
+        for unit in state.tables.units:
+            pairs = {}
+            for index in unit:
+                bits = candidates[index]
+                rest = bits & (bits - 1)
+                if not rest or rest & (rest - 1):
+                    continue
+
+                other = pairs.setdefault(bits, index)
+                if other != index:
+                    cells = [i for i in unit if i not in (index, other)]
+                    progress |= state.eliminate(cells, bits)
+
+        return progress
+
+    @staticmethod
+    def _hidden_pairs(state: "_State") -> bool:
+        candidates = state.candidates
+        progress = False
+        for unit in state.tables.units:
+            # Positions (as a bitmask over the unit) where each value fits
+            positions = {}
+            for position, index in enumerate(unit):
+                bits = candidates[index]
+                while bits:
+                    bit = bits & -bits
+                    bits ^= bit
+                    positions[bit] = positions.get(bit, 0) | (1 << position)
+
+            pairs = {}
+            for bit, where in positions.items():
+                rest = where & (where - 1)
+                if rest and not rest & (rest - 1):
+                    pairs[where] = pairs.get(where, 0) | bit
+
+            for where, bits in pairs.items():
+                rest = bits & (bits - 1)
+                if not rest or rest & (rest - 1):
+                    continue  # only a pair of values sharing these two cells is conclusive
+
+                cells = [index for position, index in enumerate(unit) if where >> position & 1]
+                for index in cells:
+                    if candidates[index] & ~bits:
+                        candidates[index] &= bits
+                        progress = True
+
+        return progress
+
+    @staticmethod
+    def _locked_candidates(state: "_State") -> bool:
+        candidates = state.candidates
+        progress = False
+        for overlap, block_rest, line_rest in state.tables.intersections:
+            overlap_bits = 0
+            for index in overlap:
+                overlap_bits |= candidates[index]
+            if not overlap_bits:
+                continue
+
+            block_bits, line_bits = 0, 0
+            for index in block_rest:
+                block_bits |= candidates[index]
+            for index in line_rest:
+                line_bits |= candidates[index]
+
+            pointing = overlap_bits & ~block_bits
+            if pointing & line_bits:
+                progress |= state.eliminate(line_rest, pointing)
+
+            claiming = overlap_bits & ~line_bits
+            if claiming & block_bits:
+                progress |= state.eliminate(block_rest, claiming)
+
+        return progress
+
+
+class _State:
+    """Puzzle, candidates, and trail shared by the rules during one propagation."""
+
+    def __init__(
+        self,
+        puzzle: Puzzle,
+        trail: Optional[Trail],
+        tables: PeerTables,
+        candidates: List[int],
+    ):
+        self.puzzle = puzzle
+        self.trail = trail
+        self.tables = tables
+        self.candidates = candidates
+        self.n_filled = 0
+
+    def place(self, index: int, bit: int):
+        """Fill a cell with the value of a candidate bit and remove it from its peers."""
+        if self.trail is not None:
+            self.trail.assign(self.puzzle, index, bit.bit_length())
+        else:
+            self.puzzle[index] = bit.bit_length()
+        self.n_filled += 1
+
+        candidates = self.candidates
+        candidates[index] = 0
+        for peer in self.tables.peers[index]:
+            bits = candidates[peer]
+            if bits & bit:
+                bits ^= bit
+                if bits == 0:
+                    raise InvalidPuzzleError("INDETERMENENT, restore previous guess")
+                candidates[peer] = bits
+
+    def eliminate(self, cells: Sequence[int], bits: int) -> bool:
+        """Remove candidate bits from cells, returning whether any were removed."""
+        candidates = self.candidates
+        changed = False
+        for index in cells:
+            if candidates[index] & bits:
+                candidates[index] &= ~bits
+                if candidates[index] == 0:
+                    raise InvalidPuzzleError("INDETERMENENT, restore previous guess")
+                changed = True
+        return changed
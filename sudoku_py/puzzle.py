@@ -2,20 +2,37 @@
 from __future__ import annotations
 
 import re
+from array import array
 from itertools import product
 from pathlib import Path
-from typing import List, Union, Tuple, Optional
+from typing import List, Union, Tuple, Optional, Sequence
 
 from .exceptions import InvalidPuzzleError
+from .tables import get_peer_tables
+from .render import (
+    _LINE_DIGITS,
+    bits_per_cell,
+    pack_cells,
+    packed_size,
+    render_grid,
+    render_line,
+    unpack_cells,
+)
 
 
 class Puzzle:
     """Representation of a sudoku puzzle.
 
-    Puzzles are internally stored as a flat list of numbers
+    Puzzles are internally stored as a flat array of numbers (one byte per cell for orders up to
+    15). A puzzle of order `n` has rows, columns, and blocks of `n**2` cells, e.g. order 3 for
+    the classic 9x9 puzzle and order 4 for 16x16 puzzles.
 
+    Puzzles compare equal when their cells are equal, and hash on their cells, so a puzzle must
+    not be modified while it is used as a dict key or set member.
     """
 
+    __slots__ = ("data", "order", "size", "total", "_tables", "_masks")
+
     def __init__(self, input_data: Union[str, Path]):
         """Constructor.
 
@@ -24,18 +41,41 @@ class Puzzle:
                 a path to a file containing a puzzle.
         """
         self.data = self.load(input_data)
+        self._setup()
+        if not self.is_valid():
+            raise InvalidPuzzleError
+
+    @classmethod
+    def from_trusted(cls, data: Sequence[int]) -> Puzzle:
+        """Create a puzzle from a flat sequence of numbers without loading or validating it.
+
+        Only intended for data already known to describe a valid puzzle (e.g. values taken from
+        another puzzle).
+
+        Args:
+            data: Flat sequence of numbers representing a valid puzzle.
+        """
+        puzzle = cls.__new__(cls)
+        puzzle.data = data
+        puzzle._setup()
+        return puzzle
 
-        assert len(self.data) in [
-            16,
-            81,
-        ], "`Puzzle` only supports puzzles of order 2 or 3."
-        self.order = 2 if len(self.data) == 16 else 3
+    def _setup(self):
+        order = int(round(len(self.data) ** 0.25))
+        assert (
+            order >= 2 and order**4 == len(self.data)
+        ), "`Puzzle` expects (order**2)**2 elements for an order of at least 2."
 
-        self.size = self.order**2  # row/col/block size
+        self.order = order
+        self.size = order**2  # row/col/block size
         self.total = self.size**2  # total number of elements in sudoku puzzle
+        self._tables = get_peer_tables(order)
 
-        if not self.is_valid():
-            raise InvalidPuzzleError
+        try:
+            self.data = array("B" if self.size < 256 else "H", self.data)
+        except OverflowError as error:
+            raise InvalidPuzzleError from error
+        self._build_masks()
 
     @staticmethod
     def load(input_data: Union[str, Path, List[int]]) -> List[int]:
@@ -57,10 +97,22 @@ class Puzzle:
         puzzle = []
         with open(input_data, "r", encoding="utf-8") as puzzle_file:
             for line in puzzle_file.readlines():
-                puzzle += [int(i) for i in re.findall(r"\d+", line)]
+                puzzle += [
+                    0 if i == "." else int(i) for i in re.findall(r"\d+|\.", line)
+                ]
 
         return puzzle
 
+    @classmethod
+    def from_line(cls, line: str) -> Puzzle:
+        """Load puzzle from a single line of digits listing the cells row by row.
+
+        Args:
+            line: String such as "0012..." with one character per cell, `0` or `.` marks an
+                empty cell. Values above 9 are written as letters (`A` for 10, `B` for 11, ...).
+        """
+        return cls([0 if element == "." else int(element, 36) for element in line.strip()])
+
     def __getitem__(self, index: Union[int, Tuple[int, int]]) -> int:
         if isinstance(index, tuple) and len(index) == 2:
             return self.data[index[0] * len(self) + index[1]]
@@ -70,112 +122,99 @@ class Puzzle:
         assert (
             0 <= element <= self.size
         ), f"Only allowed to set values between 0 and {self.size}."
+        if isinstance(index, tuple) and len(index) == 2:
+            index = index[0] * len(self) + index[1]
+
+        row, col, block = self._tables.cell_units[index]
+        size, masks = self.size, self._masks
+        previous = self.data[index]
+        if previous != 0:
+            bit = ~(1 << (previous - 1))
+            masks[row] &= bit
+            masks[size + col] &= bit
+            masks[2 * size + block] &= bit
+        if element != 0:
+            bit = 1 << (element - 1)
+            masks[row] |= bit
+            masks[size + col] |= bit
+            masks[2 * size + block] |= bit
+
         self.data[index] = element
 
-    def __eq__(self, puzzle: Puzzle) -> bool:
-        return all(i == j for i, j in zip(self.data, puzzle.data))
+    def __eq__(self, puzzle: object) -> bool:
+        if not isinstance(puzzle, Puzzle):
+            return NotImplemented
+        return self.data == puzzle.data
+
+    def __hash__(self) -> int:
+        return hash(self.data.tobytes())
 
     def __len__(self) -> int:
         return self.size
 
     def __str__(self) -> str:
-        puzzle_string = ""
-        for row_index in range(len(self)):
-            row_string = self._get_row_str(row_index, unicode=True, left_spaces=2)
-            puzzle_string += row_string
-
-        return puzzle_string
+        return render_grid(self.data, self.order, unicode=True, left_spaces=2)
 
     def __repr__(self) -> str:
-        puzzle_string = ""
-        for row_index in range(len(self)):
-            start, end = row_index * len(self), (row_index + 1) * len(self)
-            puzzle_string += "Puzzle([" if row_index == 0 else " " * 8
-            puzzle_string += ", ".join(
-                [str(element) for element in self.data[start:end]]
-            ).strip()
-            puzzle_string += ",\n" if row_index < len(self) - 1 else ""
-
-        puzzle_string += "])"
-        return puzzle_string
-
-    def _get_row_str(
-        self, row_index: int, unicode: bool = True, left_spaces: int = 2
-    ) -> str:
-        row_string = ""
-
-        left_spaces = max(0, int(left_spaces))
-        if unicode:
-            border = ["┌", "┐", "┘", "└", "├", "┬", "┤", "┴", "─", "┼", "│"]
-        else:
-            border = ["+", "+", "+", "+", "+", "+", "+", "+", "-", "+", "|"]
-
-        # Create top bar if at top of puzzle
-        if row_index == 0:
-            row_string += " " * left_spaces
-            row_string += border[0]
-            row_string += (border[8] * (self.order + 3) + border[8] + border[5]) * (
-                self.order - 1
-            )
-            row_string += border[8] * (self.order + 3) + border[8] + border[1]
-            row_string += "\n"
-
-        # Create string for row elements
-        row = [self[row_index * len(self) + i] for i in range(len(self))]
-        row_string += " " * left_spaces
-        row_string += border[10] + " "
-        for index, element in enumerate(row):
-            row_string += str(element) if int(element) != 0 else "."
-
-            # Add column separators
-            if (index + 1) % self.order == 0:
-                row_string += " " + border[10]
-            if index + 1 < len(self):
-                row_string += " "
-            if index + 1 == len(self):
-                row_string += "\n"
-
-        # Create bottom bar
-        if (row_index + 1) % self.order == 0:
-            row_string += " " * left_spaces
-
-            if row_index + 1 < len(self):
-                row_string += border[4]
-                row_string += (border[8] * (self.order + 3) + border[8] + border[9]) * (
-                    self.order - 1
-                )
-                row_string += border[8] * (self.order + 3) + border[8] + border[6]
-            else:
-                row_string += border[3]
-                row_string += (border[8] * (self.order + 3) + border[8] + border[7]) * (
-                    self.order - 1
-                )
-                row_string += border[8] * (self.order + 3) + border[8] + border[2]
-
-            row_string += "\n"
-
-        return row_string
+        size = self.size
+        rows = [", ".join(map(str, self.data[i : i + size])) for i in range(0, self.total, size)]
+        return "Puzzle([" + (",\n" + " " * 8).join(rows) + "])"
 
     def save(self, output_path: Union[str, Path], unicode: bool = False):
-        """Save current puzzle state to file."""
-        if isinstance(output_path, str):
-            output_path = Path(output_path)
+        """Save current puzzle state to file (see `sudoku_py.render.PuzzleWriter` to save many
+        puzzles to one file)."""
+        with open(output_path, "w", encoding="utf-8") as puzzle_file:
+            puzzle_file.write(render_grid(self.data, self.order, unicode=unicode, left_spaces=0))
 
-        puzzle_string = ""
-        for row_index in range(len(self)):
-            row_string = self._get_row_str(row_index, unicode=unicode, left_spaces=0)
-            puzzle_string += row_string
+    def to_line(self) -> str:
+        """Get puzzle as a single line of digits listing the cells row by row (`0` if empty).
 
-        with open(output_path, "w", encoding="utf-8") as puzzle_file:
-            puzzle_file.write(puzzle_string)
+        Values above 9 are written as letters (`A` for 10, `B` for 11, ...), so this format is
+        limited to puzzles of order 5 or less.
+        """
+        assert self.size < len(_LINE_DIGITS), "Line format only supports orders up to 5."
+        return render_line(self.data)
+
+    def to_packed(self) -> bytes:
+        """Get puzzle cells packed as in corpus files, 4 bits per cell up to order 3 and one byte
+        per cell above (see `sudoku_py.corpus`)."""
+        return pack_cells(self.data.tobytes(), bits_per_cell(self.order))
+
+    @classmethod
+    def from_packed(cls, record: bytes, order: int = 3) -> Puzzle:
+        """Load puzzle from cells packed by `to_packed`.
+
+        Args:
+            record: Packed cells.
+            order: Order of the puzzle.
+        """
+        bits = bits_per_cell(order)
+        assert len(record) == packed_size(order, bits), f"Expected a puzzle of order {order}."
+        return cls(list(unpack_cells(record, order**4, bits)))
 
     def copy(self) -> Puzzle:
         """Return a duplicate."""
-        return Puzzle(input_data=self.data)
+        puzzle = self.__class__.__new__(self.__class__)
+        puzzle.data = self.data[:]
+        puzzle.order = self.order
+        puzzle.size = self.size
+        puzzle.total = self.total
+        puzzle._tables = self._tables
+        puzzle._masks = self._masks[:]
+        return puzzle
+
+    def branch(self, index: int, options: Sequence[int]) -> List[Puzzle]:
+        """Get a copy of the puzzle for each option of a cell, with the option filled in."""
+        branches = []
+        for option in options:
+            puzzle = self.copy()
+            puzzle[index] = option
+            branches.append(puzzle)
+        return branches
 
     def is_solved(self) -> bool:
         """Check if the puzzle has any empty cells."""
-        return all(i != 0 for i in self.data)
+        return 0 not in self.data
 
     def get_empty_indices(
         self,
@@ -189,29 +228,50 @@ class Puzzle:
         return [i for i in range(len(self) ** 2) if self[i] == 0]
 
     def _get_row_indices(self, index: int) -> List[int]:
-        row_start = index // len(self)
-        return [row_start * len(self) + i for i in range(len(self))]
+        return list(self._tables.rows[self._tables.cell_units[index][0]])
 
     def _get_col_indices(self, index: int) -> List[int]:
-        col_start = index % len(self)
-        return [col_start + len(self) * i for i in range(len(self))]
+        return list(self._tables.cols[self._tables.cell_units[index][1]])
 
     def _get_block_indices(self, index: int) -> List[int]:
-        block_index = (self.order**3) * (index // self.order**3) + self.order * (
-            (index % len(self)) // self.order
-        )
-        return [
-            block_index + (i % self.order) + (i // self.order) * len(self)
-            for i in range(len(self))
-        ]
+        return list(self._tables.blocks[self._tables.cell_units[index][2]])
 
     def _get_row_col_block_indices(self, index: int) -> List[int]:
         """Get indices of the elements in the same row, column, and block as
         the input index."""
-        row_indices = self._get_row_indices(index)
-        col_indices = self._get_col_indices(index)
-        block_indices = self._get_block_indices(index)
-        return list(set(sum([row_indices, col_indices, block_indices], [])))
+        return [index, *self._tables.peers[index]]
+
+    def _get_unit_numbers(self, index: int) -> Tuple[int, int, int]:
+        """Get the row, column, and block numbers of the input index."""
+        return self._tables.cell_units[index]
+
+    def _build_masks(self):
+        """Build bitmasks of the values used in each unit (rows, then columns, then blocks).
+
+        Bit `v - 1` of a mask is set when value `v` is present in that unit. Masks are kept up to
+        date by `__setitem__`, so assign cells through indexing rather than through `data`.
+        """
+        size = self.size
+        masks = [0] * (3 * size)
+        cell_units = self._tables.cell_units
+        for index, element in enumerate(self.data):
+            if element != 0:
+                row, col, block = cell_units[index]
+                bit = 1 << (element - 1)
+                masks[row] |= bit
+                masks[size + col] |= bit
+                masks[2 * size + block] |= bit
+        self._masks = masks
+
+    def get_candidates(self, index: int) -> int:
+        """Get options for puzzle cell index as a bitmask (bit `v - 1` set if `v` is an option)."""
+        if self.data[index] != 0:
+            return 0
+
+        row, col, block = self._tables.cell_units[index]
+        size, masks = self.size, self._masks
+        used = masks[row] | masks[size + col] | masks[2 * size + block]
+        return ~used & ((1 << size) - 1)
 
     def get_options(self, index_i: int, index_j: Optional[int] = None) -> List[int]:
         """Get options for puzzle cell index."""
@@ -220,23 +280,28 @@ class Puzzle:
         else:
             index = index_i
 
-        if self[index] != 0:
-            return []
-
-        indices = self._get_row_col_block_indices(index)
-        elements = set(self[i] for i in indices if self[i] != 0)
-        return [i + 1 for i in range(len(self)) if i + 1 not in elements]
+        candidates = self.get_candidates(index)
+        return [i + 1 for i in range(len(self)) if candidates >> i & 1]
 
     def is_valid(self) -> bool:
         """Check if the puzzle is valid."""
-        valid = True
-        empty_indices = self.get_empty_indices()
-        non_empty_indices = [i for i in range(self.total) if i not in empty_indices]
-        for index in non_empty_indices:
-            indices = self._get_row_col_block_indices(index)
-            values = [self[i] for i in indices if self[i] != 0 and i != index]
-            if self[index] in values:
-                valid = False
-                break
-
-        return valid
+        row_masks = [0] * self.size
+        col_masks = [0] * self.size
+        block_masks = [0] * self.size
+        cell_units = self._tables.cell_units
+        for index, element in enumerate(self.data):
+            if element == 0:
+                continue
+            if not 0 < element <= self.size:
+                return False
+
+            row, col, block = cell_units[index]
+            bit = 1 << (element - 1)
+            if (row_masks[row] | col_masks[col] | block_masks[block]) & bit:
+                return False
+
+            row_masks[row] |= bit
+            col_masks[col] |= bit
+            block_masks[block] |= bit
+
+        return True
@@ -0,0 +1,195 @@
+"""Text and binary encodings of puzzle cells, and a writer for many puzzles to one file.
+
+Grids are formatted from a template built once per order and style, with one placeholder per
+cell, so rendering a puzzle is a single string formatting call rather than a loop over cells.
+"""
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    from .puzzle import Puzzle
+
+_LINE_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_MAX_LINE_ORDER = 5  # largest order whose values all have a digit
+
+# Translation tables from cell bytes to line characters, and splitting/joining 4-bit halves
+_DIGITS = _LINE_DIGITS.encode("ascii") + bytes(256 - len(_LINE_DIGITS))
+_HIGH = bytes(byte >> 4 for byte in range(256))
+_LOW = bytes(byte & 0xF for byte in range(256))
+_SHIFT = bytes((byte << 4) & 0xFF for byte in range(256))
+
+_BORDERS = {
+    True: ("┌", "┐", "┘", "└", "├", "┬", "┤", "┴", "─", "┼", "│"),
+    False: ("+", "+", "+", "+", "+", "+", "+", "+", "-", "+", "|"),
+}
+
+
+@lru_cache(maxsize=None)
+def grid_template(
+    order: int, unicode: bool = True, left_spaces: int = 2
+) -> Tuple[str, Tuple[str, ...]]:
+    """Get the template of a grid of some order, with a `%s` placeholder per cell.
+
+    Args:
+        order: Order of the puzzle.
+        unicode: Whether to draw borders with box drawing characters rather than `+-|`.
+        left_spaces: Number of spaces before each line.
+
+    Returns:
+        The template, and the text of each cell value (`.` for empty cells), padded to the width
+        of the largest value.
+    """
+    size = order**2
+    width = len(str(size))  # cells of larger puzzles need more than one character
+    border = _BORDERS[unicode]
+    indent = " " * max(0, int(left_spaces))
+    segment = border[8] * (order * (width + 1) + 1)
+
+    def bar(left: str, middle: str, right: str) -> str:
+        return indent + left + middle.join([segment] * order) + right + "\n"
+
+    block = " ".join(["%s"] * order)
+    row = indent + border[10] + " " + f" {border[10]} ".join([block] * order) + " " + border[10]
+    band = "\n".join([row] * order) + "\n"
+    template = (
+        bar(border[0], border[5], border[1])
+        + bar(border[4], border[9], border[6]).join([band] * order)
+        + bar(border[3], border[7], border[2])
+    )
+    cells = tuple(("." if value == 0 else str(value)).rjust(width) for value in range(size + 1))
+    return template, cells
+
+
+def render_grid(
+    cells: Sequence[int], order: int, unicode: bool = True, left_spaces: int = 2
+) -> str:
+    """Draw the cells of a puzzle as a grid, see `grid_template`."""
+    template, texts = grid_template(order, unicode, left_spaces)
+    return template % tuple(map(texts.__getitem__, cells))
+
+
+def render_line(cells: Sequence[int]) -> str:
+    """Write the cells of a puzzle (up to order 5) on a single line, see `Puzzle.to_line`."""
+    # Values of larger puzzles have no digit, and would be written as NUL characters
+    assert len(cells) <= _MAX_LINE_ORDER**4, "Line format only supports orders up to 5."
+    if isinstance(cells, (bytes, bytearray)) or getattr(cells, "typecode", None) == "B":
+        return bytes(cells).translate(_DIGITS).decode("ascii")
+    return "".join(_LINE_DIGITS[element] for element in cells)
+
+
+def bits_per_cell(order: int) -> int:
+    """Get the number of bits used for each cell of a packed puzzle of some order."""
+    assert 2 <= order <= 15, "Packed puzzles are supported for orders 2 to 15."
+    return 4 if order <= 3 else 8
+
+
+def packed_size(order: int, bits: int) -> int:
+    """Get the number of bytes of a packed puzzle."""
+    return (order**4 * bits + 7) // 8
+
+
+def pack_cells(cells: bytes, bits: int) -> bytes:
+    """Pack cells given as one byte each into `bits` (4 or 8) bits each."""
+    if bits == 8:
+        return cells
+    if len(cells) % 2:
+        cells += b"\0"
+    high = int.from_bytes(cells[0::2].translate(_SHIFT), "big")
+    low = int.from_bytes(cells[1::2], "big")
+    return (high | low).to_bytes(len(cells) // 2, "big")
+
+
+def unpack_cells(record: bytes, total: int, bits: int) -> bytes:
+    """Unpack `total` cells of `bits` (4 or 8) bits each into one byte each."""
+    if bits == 8:
+        return record
+    cells = bytearray(2 * len(record))
+    cells[0::2] = record.translate(_HIGH)
+    cells[1::2] = record.translate(_LOW)
+    return bytes(cells[:total])
+
+
+class PuzzleWriter:
+    """Write many puzzles to a single text file, one after the other.
+
+    Puzzles are rendered in chunks and written through a large buffer, so writing millions of
+    puzzles costs one file open and few system calls. Binary output is written by
+    `sudoku_py.corpus.CorpusWriter`.
+    """
+
+    formats = ["grid", "line"]
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        output_format: str = "grid",
+        unicode: bool = False,
+        append: bool = False,
+        buffer_size: int = 1 << 20,
+    ):
+        """Constructor.
+
+        Args:
+            path: Path of the output file.
+            output_format: Either "grid" (puzzles drawn as in `Puzzle.save`, separated by blank
+                lines) or "line" (one puzzle per line, as in `Puzzle.to_line`, up to order 5).
+            unicode: Whether grids are drawn with box drawing characters.
+            append: Whether to add puzzles to the end of an existing file rather than replace it.
+            buffer_size: Size of the write buffer in bytes.
+        """
+        assert output_format in self.formats, f"`output_format` must be one of {self.formats}."
+        self.path = Path(path)
+        self.output_format = output_format
+        self.unicode = unicode
+        self.count = 0
+        # Grids are separated by blank lines, including from those already in the file
+        self._started = append and self.path.exists() and self.path.stat().st_size > 0
+        self._file = open(
+            self.path, "a" if append else "w", encoding="utf-8", buffering=buffer_size
+        )
+
+    def __enter__(self) -> "PuzzleWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _render(self, puzzle: "Puzzle") -> str:
+        if self.output_format == "line":
+            return render_line(puzzle.data) + "\n"
+        return render_grid(puzzle.data, puzzle.order, self.unicode, left_spaces=0)
+
+    def write(self, puzzle: "Puzzle"):
+        """Append a puzzle."""
+        text = self._render(puzzle)
+        if self._started and self.output_format == "grid":
+            text = "\n" + text
+        self._file.write(text)
+        self._started = True
+        self.count += 1
+
+    def write_many(self, puzzles: Iterable["Puzzle"], chunksize: int = 1024) -> int:
+        """Append every puzzle, returning how many were written."""
+        start = self.count
+        puzzles = iter(puzzles)
+        separator = "\n" if self.output_format == "grid" else ""
+        while True:
+            chunk = [self._render(puzzle) for puzzle in islice(puzzles, chunksize)]
+            if not chunk:
+                break
+            text = separator.join(chunk)
+            if self._started:
+                text = separator + text
+            self._file.write(text)
+            self._started = True
+            self.count += len(chunk)
+        return self.count - start
+
+    def close(self):
+        """Flush the buffer and close the file."""
+        self._file.close()
@@ -0,0 +1,312 @@
+"""Long-running server answering solve, count, and generate requests over a local socket.
+
+Requests and responses are JSON objects written one per line (newline-delimited JSON). A client
+may send many requests without waiting for the responses, which are written as soon as each
+request is answered, so they can arrive in another order than the requests: every response
+carries the `id` of its request.
+
+Requests are answered by a pool of worker processes, each holding a warm `Solver`, a `Generator`
+per difficulty and method, and the peer tables of the usual orders. At most `max_pending`
+requests are in flight at a time, after which the server stops reading from its clients until
+one is answered, so a client sending too fast is slowed down by its socket rather than growing
+a queue without bound.
+
+Requests:
+    {"id": 1, "op": "solve", "puzzle": "003020600900305...", "limit": 1}
+    {"id": 2, "op": "count", "puzzle": "003020600900305...", "limit": null}
+    {"id": 3, "op": "generate", "difficulty": 3, "method": "mask", "seed": 42}
+
+`puzzle` is written as in `Puzzle.from_line`, and `limit` is the number of solutions to stop
+at (every solution if null, default is 1 for "solve" and null for "count"). Solve and count
+requests may set their own `loops`, `timeout`, and `max_nodes` budgets (those of the server's
+solver otherwise), and "solve" requests may ask for the search statistics with `"stats": true`.
+
+Responses:
+    {"id": 1, "status": "solved", "solutions": ["483921657967345..."]}
+    {"id": 2, "status": "solved", "count": 1}
+    {"id": 3, "status": "generated", "puzzle": "000000907000420..."}
+
+The status of a solve or count request is one of `sudoku_py.batch.statuses`. If it is
+"exhausted", a budget ran out first and the solutions are only part of them, or the count only a
+lower bound. A request that can't be answered gets the status "error" and an `error` message.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from .puzzle import Puzzle
+from .solver import Solver
+from .generator import Generator
+from .tables import get_peer_tables
+from .pool import worker_pool, worker_state
+from .exceptions import InvalidPuzzleError
+
+logger = logging.getLogger(__name__)
+
+Address = Union[str, Path, Tuple[str, int]]
+
+
+class SolverServer:
+    """Serves solve, count, and generate requests from a pool of warm worker processes."""
+
+    ops = ["solve", "count", "generate"]
+
+    def __init__(
+        self,
+        solver: Optional[Solver] = None,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        difficulty: int = 3,
+        method: str = "mask",
+    ):
+        """Constructor.
+
+        Args:
+            solver: Solver answering solve and count requests (default settings if not given).
+            workers: Number of worker processes (number of CPUs if not given).
+            max_pending: Number of requests in flight (received but not answered yet) before the
+                server stops reading requests (16 per worker if not given).
+            difficulty: Difficulty of generated puzzles when a request doesn't set it.
+            method: Generation method when a request doesn't set it (see `Generator.methods`).
+        """
+        assert method in Generator.methods, f"`method` must be one of {Generator.methods}."
+        self.solver = solver or Solver()
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 16 * self.workers
+        assert self.max_pending > 0, "`max_pending` should be larger than 0."
+        self.difficulty = difficulty
+        self.method = method
+        self._executor = None
+        self._slots = None
+
+    def serve(self, address: Address):
+        """Start the worker pool and answer requests until interrupted (SIGINT or SIGTERM).
+
+        Args:
+            address: Path of a Unix socket, or (host, port) of a TCP socket (use a local host
+                such as "127.0.0.1", requests are not authenticated).
+        """
+        state = (self.solver, self.difficulty, self.method)
+        with worker_pool(self.workers, state, setup=_setup_worker) as executor:
+            # Start every worker now rather than on the first requests
+            for future in [executor.submit(_warm_up) for _ in range(self.workers)]:
+                future.result()
+
+            self._executor = executor
+            try:
+                asyncio.run(self._serve(address))
+            finally:
+                self._executor = None
+
+    async def _serve(self, address: Address):
+        self._slots = asyncio.Semaphore(self.max_pending)
+        if isinstance(address, tuple):
+            server = await asyncio.start_server(self._handle_client, *address)
+        else:
+            server = await asyncio.start_unix_server(self._handle_client, str(address))
+
+        sockets = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        logger.info("Serving on %s with %d workers", sockets, self.workers)
+        serving = asyncio.ensure_future(server.serve_forever())
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, serving.cancel)
+            except NotImplementedError:
+                pass  # no signal handlers in Windows event loops, Ctrl-C still stops the server
+        try:
+            async with server:
+                await serving
+        except asyncio.CancelledError:
+            logger.info("Stopped serving on %s", sockets)
+        finally:
+            if not isinstance(address, tuple) and Path(address).exists():
+                Path(address).unlink()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        lock = asyncio.Lock()  # responses are written one at a time
+        tasks = set()
+        try:
+            while True:
+                # Wait for a free slot before reading, which leaves further requests in the socket
+                await self._slots.acquire()
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError) as error:
+                    # ValueError is raised for lines over the reader's limit
+                    self._slots.release()
+                    logger.info("Dropping client: %s", error)
+                    break
+                if not line:
+                    self._slots.release()
+                    break
+                if not line.strip():
+                    self._slots.release()
+                    continue
+
+                future = loop.run_in_executor(self._executor, _handle_line, line)
+                task = asyncio.ensure_future(self._respond(future, line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            # Answer the requests received before the client stopped writing
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _respond(
+        self,
+        future: "asyncio.Future[bytes]",
+        line: bytes,
+        writer: asyncio.StreamWriter,
+        lock: asyncio.Lock,
+    ):
+        try:
+            response = await future
+        except Exception as error:  # pylint: disable=broad-except
+            # e.g. BrokenProcessPool, the client still gets an answer for the id it sent
+            logger.error("Request failed in its worker: %r", error)
+            response = _error_response(line, error)
+        finally:
+            self._slots.release()
+        async with lock:
+            if writer.is_closing():
+                return
+            try:
+                writer.write(response)
+                await writer.drain()
+            except ConnectionError as error:
+                logger.info("Dropping response: %s", error)
+
+
+def parse_address(address: str) -> Address:
+    """Read a socket address given on the command line.
+
+    Args:
+        address: "HOST:PORT" or "PORT" for a TCP socket (on 127.0.0.1 if no host is given), or
+            the path of a Unix socket.
+    """
+    host, _, port = address.rpartition(":")
+    if port.isdigit() and (host or address == port):
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def handle_request(
+    request: Dict[str, Any],
+    solver: Solver,
+    generators: Dict[Tuple[int, str], Generator],
+    difficulty: int = 3,
+    method: str = "mask",
+) -> Dict[str, Any]:
+    """Answer a request (see the module documentation for the protocol).
+
+    Args:
+        request: Decoded request.
+        solver: Solver answering solve and count requests. Budgets set by the request are
+            restored once it is answered.
+        generators: Generators by (difficulty, method), created as requests need them.
+        difficulty: Difficulty of generated puzzles when the request doesn't set it.
+        method: Generation method when the request doesn't set it.
+
+    Returns:
+        The response, with the `id` of the request.
+    """
+    response = {"id": request.get("id")}
+    op = request.get("op")
+    if op not in SolverServer.ops:
+        response.update(status="error", error=f"`op` must be one of {SolverServer.ops}.")
+        return response
+
+    if op == "generate":
+        key = (int(request.get("difficulty", difficulty)), request.get("method", method))
+        if key not in generators:
+            generators[key] = Generator(difficulty=key[0], loops=solver.loops, method=key[1])
+        puzzle = generators[key].spawn(rng_seed=request.get("seed"))
+        response.update(status="generated", puzzle=puzzle.to_line())
+        return response
+
+    try:
+        puzzle = Puzzle.from_line(request["puzzle"])
+    except (AssertionError, ValueError, InvalidPuzzleError):
+        response["status"] = "invalid"
+        return response
+
+    budgets = {
+        name: request[name] for name in ("loops", "timeout", "max_nodes") if name in request
+    }
+    defaults = {name: getattr(solver, name) for name in budgets}
+    try:
+        for name, value in budgets.items():
+            setattr(solver, name, value)
+        if op == "count":
+            # Solutions are only counted, not kept
+            count = solver.count_solutions(puzzle, limit=request.get("limit"))
+        else:
+            result = solver.solve(puzzle, limit=request.get("limit", 1))
+    finally:
+        for name, value in defaults.items():
+            setattr(solver, name, value)
+
+    if op == "count":
+        if solver.exhausted:
+            response["status"] = "exhausted"
+        else:
+            response["status"] = "solved" if count else "unsolvable"
+        response["count"] = count
+        return response
+
+    response["status"] = result.status
+    response["solutions"] = [solution.to_line() for solution in result.solutions]
+    if request.get("stats"):
+        response["stats"] = result.stats.as_dict()
+    return response
+
+
+def _setup_worker(
+    state: Tuple[Solver, int, str]
+) -> Tuple[Solver, Dict[Tuple[int, str], Generator], int, str]:
+    solver, difficulty, method = state
+    # Ctrl-C in a terminal also reaches the workers, which are stopped by the server instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    generators = {
+        (difficulty, method): Generator(difficulty=difficulty, loops=solver.loops, method=method)
+    }
+    for order in (2, 3, 4):
+        get_peer_tables(order)
+    return solver, generators, difficulty, method
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _handle_line(line: bytes) -> bytes:
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("Requests must be JSON objects.")
+        response = handle_request(request, *worker_state())
+    except Exception as error:  # pylint: disable=broad-except
+        # A bad request is answered with an error rather than stopping the worker
+        return _error_response(line, error)
+    return json.dumps(response).encode("utf-8") + b"\n"
+
+
+def _error_response(line: bytes, error: Exception) -> bytes:
+    """Get the error response to a request line, with its id if it has one."""
+    try:
+        request = json.loads(line)
+    except ValueError:
+        request = None
+    request_id = request.get("id") if isinstance(request, dict) else None
+    response = {"id": request_id, "status": "error", "error": repr(error)}
+    return json.dumps(response).encode("utf-8") + b"\n"
@@ -1,28 +1,99 @@
 """Classes and methods for solving sudoku puzzles."""
 import logging
-from typing import List, Tuple, Dict, Union
+from functools import partial
+from itertools import islice
+from random import Random
+from time import perf_counter
+from typing import TYPE_CHECKING, List, Tuple, Dict, Union, Optional, Iterator, Sequence, Callable
 from warnings import warn
 
 from .puzzle import Puzzle
-from .checkpointer import Checkpointer
+from .checkpointer import Checkpointer, Trail
+from .propagation import Propagator
+from .branching import Brancher
+from .dlx import build_exact_cover
+from .stats import SolveStats, SolveResult
 from .exceptions import InvalidPuzzleError, UnsolvedWarning, EmptyCheckpointer
 
+if TYPE_CHECKING:
+    from .cache import SolutionCache
+
 logger = logging.getLogger(__name__)
 
 
-# TODO experiment with yield and next(..)
 class Solver:
     """Manages solving operations when given a Sudoku object."""
 
-    def __init__(self, loops: int = 10000):
+    backends = ["checkpoint", "trail", "dlx"]
+
+    def __init__(
+        self,
+        loops: int = 10000,
+        backend: str = "checkpoint",
+        rules: Sequence[str] = ("naked_singles", "hidden_singles"),
+        deltas: bool = False,
+        cache: Optional["SolutionCache"] = None,
+        on_guess: Optional[Callable[[Puzzle, int, int], None]] = None,
+        on_backtrack: Optional[Callable[[Puzzle, int], None]] = None,
+        timeout: Optional[float] = None,
+        max_nodes: Optional[int] = None,
+        branching: str = "mrv",
+        value_order: str = "descending",
+        restarts: Optional[int] = None,
+        rng_seed: Optional[int] = None,
+    ):
         """Constructor.
 
         Args:
             loops: number of loops to do over every cell before giving up.
-            patience: number of loops without changes to wait before guessing.
+            backend: search strategy, either "checkpoint" (fill singles on a fresh copy every loop
+                and stash a copy of the puzzle at every guess), "trail" (fill and guess in place
+                on a single working puzzle, undoing recorded assignments when backtracking), or
+                "dlx" (solve as an exact cover problem with dancing links, every placement tried
+                counts as a loop).
+            rules: deduction rules applied before every guess (see `Propagator.available_rules`),
+                not used by the "dlx" backend.
+            deltas: whether the "checkpoint" backend saves only the cells changed between
+                checkpoints rather than a copy of the puzzle at every guess (see `Checkpointer`).
+            cache: cache consulted by `__call__` before searching, and filled with the solutions
+                it finds (see `SolutionCache`).
+            on_guess: called as `on_guess(puzzle, index, depth)` after every guess, with the
+                puzzle holding the guessed value at `index` and the number of open checkpoints.
+            on_backtrack: called as `on_backtrack(puzzle, depth)` every time the search returns
+                to a checkpoint, with the puzzle holding the next guess. Hooks are not called by
+                the "dlx" backend, and must not modify the puzzle (the "trail" backend passes its
+                working puzzle).
+            timeout: seconds a search may run before giving up (no limit if not given), checked
+                at every loop.
+            max_nodes: number of guesses (placements tried by the "dlx" backend) a search may
+                make before giving up (no limit if not given).
+            branching: strategy selecting the cell to guess (see `Brancher.cell_strategies`),
+                not used by the "dlx" backend.
+            value_order: order in which the values of a guessed cell are tried (see
+                `Brancher.value_orders`), not used by the "dlx" backend.
+            restarts: number of backtracks after which a search that has not found a solution
+                yet starts over from the input puzzle, doubled at every restart (never restarts
+                if not given). Ties between cells are then broken at random, so that every
+                restart explores a different tree. Not used by the "dlx" backend.
+            rng_seed: seed of the random tie-breaks and of the "random" value order.
         """
+        assert backend in self.backends, f"`backend` must be one of {self.backends}."
         self.loops = loops
-        self.checkpointer = Checkpointer()
+        self.backend = backend
+        self.propagator = Propagator(rules)
+        self.deltas = deltas
+        self.checkpointer = Checkpointer(deltas)
+        self.cache = cache
+        self.on_guess = on_guess
+        self.on_backtrack = on_backtrack
+        self.timeout = timeout
+        self.max_nodes = max_nodes
+        randomized = restarts is not None or value_order == "random"
+        self.brancher = Brancher(branching, value_order, Random(rng_seed) if randomized else None)
+        self.restarts = restarts
+        self.exhausted = False
+        self.stats = SolveStats()
+        self._paused = None  # search left when a budget ran out, see `resume`
 
     def __call__(
         self,
@@ -32,64 +103,407 @@ class Solver:
         """Solves the sudoku puzzle.
 
         Guesses are managed per loop in a dictionary that maps puzzle indices
-        to a list of possible values.
+        to a list of possible values. With a `cache`, puzzles that are the same as a cached one up
+        to symmetry are answered from it without searching.
 
         Args:
             puzzle: Unsolved sudoku puzzle
 
         Returns:
             Fully solved puzzle if successful, unsolved puzzle if unsuccessful. If `all_solutions`
-            is True, returns a list of all solutions.
+            is True, returns a list of all solutions, or of those found before a budget ran out
+            with a warning.
         """
         if puzzle.is_solved():
             return puzzle
 
-        solutions = []
-        input_puzzle = puzzle.copy()
-        puzzle = puzzle.copy()
+        result = self.solve(puzzle, limit=None if all_solutions else 1)
+        solutions = result.solutions
+        if result.status == "exhausted" and solutions:
+            warn(
+                f"Found {len(solutions)} solutions before the search ran out of budget (loops, "
+                "timeout, or max_nodes), there may be more.",
+                UnsolvedWarning,
+            )
+        elif result.status == "exhausted":
+            warn(
+                "Unsolved, the search ran out of budget (loops, timeout, or max_nodes).",
+                UnsolvedWarning,
+            )
+            return puzzle.copy()
+        if result.status == "unsolvable":
+            warn("Unsolved, the puzzle has no solution.", UnsolvedWarning)
+            return puzzle.copy()
+
+        if all_solutions:
+            return solutions
+
+        return solutions[0]
+
+    def solve(self, puzzle: Puzzle, limit: Optional[int] = 1) -> SolveResult:
+        """Solve the sudoku puzzle and report statistics of the search.
+
+        The `cache` is used as in `__call__`, `stats.cached` is set when the solutions are taken
+        from it.
+
+        Args:
+            puzzle: Unsolved sudoku puzzle.
+            limit: Maximum number of solutions to find (all solutions if None).
+
+        Returns:
+            Solutions found (only part of them if a budget runs out first), the statistics of
+            the search, and whether a budget (`loops`, `timeout`, or `max_nodes`) ran out before
+            `limit` solutions were found, in which case the search can be continued with
+            `resume`.
+        """
+        solutions = None
+        if self.cache is not None:
+            solutions = self.cache.get(puzzle, limit != 1)
+            if solutions is not None:
+                solutions = solutions[:limit]
+                self.exhausted = False
+                self._paused = None
+                self.stats = SolveStats()
+                self.stats.cached = True
+                self.stats.solutions = len(solutions)
+
+        if solutions is None:
+            solutions = list(self.iter_solutions(puzzle, limit=limit))
+            if self.cache is not None and (solutions or not self.exhausted):
+                complete = not self.exhausted and (limit is None or len(solutions) < limit)
+                self.cache.put(puzzle, solutions, complete)
+
+        return SolveResult(solutions, self.stats, self.exhausted)
+
+    def resume(self, limit: Optional[int] = 1) -> SolveResult:
+        """Continue the last search of the "checkpoint" or "trail" backend that ran out of budget.
+
+        The search restarts from the puzzle and checkpoints it was left at, with fresh budgets,
+        and its statistics are added to those of the search it continues.
+
+        Args:
+            limit: Maximum number of solutions to find (all remaining solutions if None).
+
+        Returns:
+            Solutions found that were not found before the search was interrupted, statistics of
+            the whole search, and whether a budget ran out again.
+        """
+        assert self._paused is not None, "There is no exhausted search to resume."
+        solutions = self._paused()
+        try:
+            found = list(islice(solutions, limit))
+        finally:
+            solutions.close()
+        return SolveResult(found, self.stats, self.exhausted)
+
+    @property
+    def can_resume(self) -> bool:
+        """Whether the last search ran out of budget and can be continued with `resume`."""
+        return self._paused is not None
+
+    def split(self) -> List[Puzzle]:
+        """Split the rest of the last search that ran out of budget into independent puzzles.
+
+        The solutions of the returned puzzles are exactly the solutions `resume` would find:
+        the puzzle the search was left at, and one puzzle per untried option of every open
+        checkpoint. The search can no longer be resumed afterwards.
+
+        Returns:
+            Sub-puzzles covering the unexplored part of the decision tree.
+        """
+        assert self._paused is not None, "There is no exhausted search to split."
+        puzzle, checkpointer = self._paused.args[:2]
+        self._paused = None
+
+        sub_puzzles = [puzzle.copy()]
+        if isinstance(checkpointer, Trail):
+            # The puzzle at each checkpoint is recovered by undoing later assignments
+            for mark, index, options in reversed(checkpointer.history):
+                checkpointer.undo(mark)
+                sub_puzzles += puzzle.branch(index, options)
+            checkpointer.reset()
+        else:
+            for saved, index, options in reversed(checkpointer.saved_states()):
+                sub_puzzles += saved.branch(index, options)
+        return sub_puzzles
+
+    def iter_solutions(self, puzzle: Puzzle, limit: Optional[int] = None) -> Iterator[Puzzle]:
+        """Yield solutions of the sudoku puzzle as they are found.
+
+        The search is resumed each time the next solution is requested, so solutions can be
+        processed (or the search abandoned) without waiting for the whole decision tree.
+
+        Args:
+            puzzle: Unsolved sudoku puzzle.
+            limit: Maximum number of solutions to yield (no limit if not given).
+
+        Yields:
+            Fully solved puzzles. Nothing is yielded if the puzzle has no solution or if a budget
+            (`loops`, `timeout`, or `max_nodes`) runs out first, `exhausted` is set in the latter
+            case.
+        """
+        self.stats = SolveStats()
+        self._paused = None
+        if limit is not None and limit < 1:
+            return
+
+        if puzzle.is_solved():
+            self.stats.solutions += 1
+            yield puzzle.copy()
+            return
+
+        if self.backend == "trail":
+            solutions = self._iter_in_place(puzzle.copy())
+        elif self.backend == "dlx":
+            solutions = self._iter_exact_cover(puzzle)
+        else:
+            solutions = self._iter_with_copies(puzzle)
+
+        try:
+            yield from islice(solutions, limit)
+        finally:
+            solutions.close()
+
+    def count_solutions(self, puzzle: Puzzle, limit: Optional[int] = 2) -> int:
+        """Count the solutions of the sudoku puzzle, stopping as soon as `limit` are found.
+
+        Args:
+            puzzle: Unsolved sudoku puzzle.
+            limit: Number of solutions to stop searching at (count all solutions if None).
+
+        Returns:
+            Number of solutions found, at most `limit`. This is a lower bound if the maximum
+            number of loops is reached first (see `exhausted`).
+        """
+        return sum(1 for _ in self.iter_solutions(puzzle, limit=limit))
+
+    def has_unique_solution(self, puzzle: Puzzle) -> bool:
+        """Check if the sudoku puzzle has exactly one solution.
+
+        The search stops as soon as a second solution is found.
+        """
+        return self.count_solutions(puzzle, limit=2) == 1
+
+    def _iter_with_copies(
+        self,
+        puzzle: Puzzle,
+        checkpointer: Optional[Checkpointer] = None,
+        root: Optional[Puzzle] = None,
+    ) -> Iterator[Puzzle]:
+        """Search for solutions on copies of the puzzle, see `Checkpointer`.
+
+        The search continues from `checkpointer` if given, with `puzzle` as the working state and
+        `root` as the input puzzle.
+        """
+        if checkpointer is None:
+            checkpointer = Checkpointer(self.deltas)
+            puzzle = root = puzzle.copy()
+        self.checkpointer = checkpointer
+        self.exhausted = False
+        self._paused = None
+        stats, times = self.stats, self.stats.times
+        debug = logger.isEnabledFor(logging.DEBUG)
+        deadline, max_guesses = self._budgets()
+        restart_every = self.restarts
+        restart_at = None if restart_every is None else stats.backtracks + restart_every
         for loop in range(self.loops):
+            start = perf_counter()
+            if deadline is not None and start >= deadline:
+                break
+            if restart_at is not None and stats.backtracks >= restart_at and not stats.solutions:
+                checkpointer = self.checkpointer = Checkpointer(self.deltas)
+                puzzle = root.copy()
+                restart_every *= 2
+                restart_at = stats.backtracks + restart_every
+                stats.restarts += 1
+            stats.loops += 1
             try:
-                puzzle_output = self.fill_singles(puzzle)
+                puzzle_output = puzzle.copy()
+                candidates = self.propagator(puzzle_output, stats=stats)
             except InvalidPuzzleError:
+                times["propagation"] += perf_counter() - start
                 try:
-                    puzzle = self.checkpointer.pop()
+                    puzzle = self._backtrack()
                     continue
                 except EmptyCheckpointer:
-                    break
+                    return
 
+            filled = perf_counter()
+            times["propagation"] += filled - start
             if puzzle_output == puzzle:
-                logger.debug("Multiple possibilities, taking a guess")
-                puzzle_output = self.guess(puzzle_output)
+                if max_guesses is not None and stats.guesses >= max_guesses:
+                    break
+                if debug:
+                    logger.debug("Multiple possibilities, taking a guess")
+                # Candidates eliminated by the rules are not guessed
+                puzzle_output = self.guess(puzzle_output, candidates)
+                times["branching"] += perf_counter() - filled
 
             puzzle = puzzle_output
 
-            logger.debug("Completed loop %d", loop + 1)
+            if debug:
+                logger.debug("Completed loop %d", loop + 1)
             if puzzle.is_solved():
-                solutions.append(puzzle.copy())
-                if all_solutions:
+                stats.solutions += 1
+                yield puzzle.copy()
+                try:
+                    puzzle = self._backtrack()
+                except EmptyCheckpointer:
+                    return
+
+        self.exhausted = True
+        self._paused = partial(self._iter_with_copies, puzzle, checkpointer, root)
+
+    def _iter_in_place(self, puzzle: Puzzle, trail: Optional[Trail] = None) -> Iterator[Puzzle]:
+        """Search for solutions by filling and guessing in place on the input puzzle.
+
+        Every assignment is recorded on a `Trail`, and the puzzle is restored to its input state
+        when the search finishes or is abandoned, unless a budget runs out, in which case the
+        search can continue from `trail` later.
+        """
+        if trail is None:
+            trail = Trail(puzzle)
+        self.checkpointer = trail
+        self.exhausted = False
+        self._paused = None
+        stats, times = self.stats, self.stats.times
+        debug = logger.isEnabledFor(logging.DEBUG)
+        deadline, max_guesses = self._budgets()
+        restart_every = self.restarts
+        restart_at = None if restart_every is None else stats.backtracks + restart_every
+        try:
+            for loop in range(self.loops):
+                start = perf_counter()
+                if deadline is not None and start >= deadline:
+                    break
+                if (
+                    restart_at is not None
+                    and stats.backtracks >= restart_at
+                    and not stats.solutions
+                ):
+                    trail.reset()
+                    restart_every *= 2
+                    restart_at = stats.backtracks + restart_every
+                    stats.restarts += 1
+                stats.loops += 1
+                try:
+                    candidates = self.propagator(puzzle, trail, stats)
+                except InvalidPuzzleError:
+                    times["propagation"] += perf_counter() - start
                     try:
-                        puzzle = self.checkpointer.pop()
+                        self._backtrack()
                         continue
                     except EmptyCheckpointer:
-                        break
+                        return
+
+                filled = perf_counter()
+                times["propagation"] += filled - start
+                if debug:
+                    logger.debug("Completed loop %d", loop + 1)
+                index = self.brancher.select(puzzle, candidates)
+                if index is None:
+                    times["branching"] += perf_counter() - filled
+                    stats.solutions += 1
+                    yield puzzle.copy()
+                    try:
+                        self._backtrack()
+                    except EmptyCheckpointer:
+                        return
                 else:
-                    break
-
-        if len(solutions) == 0:
-            warn("Unsolved after reaching maximum number of loops.", UnsolvedWarning)
-            return input_puzzle
-
-        if all_solutions:
-            return solutions
-
-        return solutions[0]
+                    options = self.brancher.order(puzzle, candidates, index)
+                    if len(options) == 1:
+                        trail.assign(puzzle, index, options[0])
+                    else:
+                        if max_guesses is not None and stats.guesses >= max_guesses:
+                            break
+                        if debug:
+                            logger.debug("Multiple possibilities, taking a guess")
+                        # Options are popped from the end of the list
+                        trail.stash(puzzle, index, options[::-1])
+                        self._record_guess(puzzle, index)
+                    times["branching"] += perf_counter() - filled
+
+            self.exhausted = True
+            self._paused = partial(self._iter_in_place, puzzle, trail)
+        finally:
+            if self._paused is None:
+                trail.undo()
+
+    def _iter_exact_cover(self, puzzle: Puzzle) -> Iterator[Puzzle]:
+        """Search for solutions with Algorithm X, see `build_exact_cover`.
+
+        Every placement tried counts as a loop, and the whole search is timed as branching. The
+        search cannot be resumed once a budget runs out.
+        """
+        self.exhausted = False
+        self._paused = None
+        stats, times = self.stats, self.stats.times
+        deadline, _ = self._budgets()
+        max_nodes = self.loops if self.max_nodes is None else min(self.loops, self.max_nodes)
+        start = perf_counter()
+        dancing_links, placements = build_exact_cover(puzzle)
+        for selected in dancing_links.search(max_nodes=max_nodes, deadline=deadline):
+            solution = puzzle.copy()
+            for row in selected:
+                index, element = placements[row]
+                solution[index] = element
+            stats.loops = dancing_links.nodes
+            stats.solutions += 1
+            times["branching"] += perf_counter() - start
+            yield solution
+            start = perf_counter()
+
+        stats.loops = dancing_links.nodes
+        times["branching"] += perf_counter() - start
+        self.exhausted = dancing_links.exhausted
+
+    def _budgets(self) -> Tuple[Optional[float], Optional[int]]:
+        """Get the `perf_counter` time and the number of guesses a search must stop at."""
+        deadline = None if self.timeout is None else perf_counter() + self.timeout
+        max_guesses = None if self.max_nodes is None else self.stats.guesses + self.max_nodes
+        return deadline, max_guesses
+
+    def _record_guess(self, puzzle: Puzzle, index: int):
+        """Count a guess just stashed on the checkpointer and call the `on_guess` hook."""
+        stats = self.stats
+        depth = len(self.checkpointer)
+        stats.guesses += 1
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+        if self.on_guess is not None:
+            self.on_guess(puzzle, index, depth)
+
+    def _backtrack(self) -> Puzzle:
+        """Return to the last checkpoint, counting the backtrack and calling `on_backtrack`.
+
+        Raises:
+            EmptyCheckpointer: If there is no checkpoint left.
+        """
+        start = perf_counter()
+        try:
+            puzzle = self.checkpointer.pop()
+        finally:
+            self.stats.times["backtracking"] += perf_counter() - start
+        self.stats.backtracks += 1
+        if self.on_backtrack is not None:
+            self.on_backtrack(puzzle, len(self.checkpointer))
+        return puzzle
 
     @staticmethod
-    def fill_singles(puzzle: Puzzle) -> Puzzle:
-        """Iterate over puzzle cells sequentially, fill cells that only have one possibility.
+    def fill_singles(
+        puzzle: Puzzle,
+        rules: Sequence[str] = ("naked_singles",),
+        stats: Optional[SolveStats] = None,
+    ) -> Puzzle:
+        """Fill cells that only have one possibility until no more can be filled.
+
+        Each filled value is immediately excluded from the options of the cells in its row,
+        column, and block, so cells forced by an earlier fill are filled in the same call.
 
         Args:
             puzzle: An unsolved puzzle
+            rules: Deduction rules to apply (see `Propagator`).
+            stats: Statistics to record propagation sweeps and filled cells on.
 
         Return:
             Puzzle with some cells filled in.
@@ -98,43 +512,36 @@ class Solver:
             return puzzle
 
         puzzle_output = puzzle.copy()
-        for empty_index in puzzle.get_empty_indices():
-            options = puzzle.get_options(empty_index)
-
-            if len(options) == 0:
-                raise InvalidPuzzleError("INDETERMENENT, restore previous guess")
-
-            if len(options) == 1:
-                puzzle_output[empty_index] = options[0]
-
+        Propagator(rules)(puzzle_output, stats=stats)
         return puzzle_output
 
-    def guess(self, puzzle: Puzzle) -> Puzzle:
-        """Select cell with minimal number of options and estimate value
-        before creating a checkpoint.
+    def guess(self, puzzle: Puzzle, candidates: Optional[List[int]] = None) -> Puzzle:
+        """Select a cell with `brancher` and estimate its value before creating a checkpoint.
 
         Possibility selected will be removed before creating a checkpoint.
 
         Args:
             puzzle: unsolved puzzle.
+            candidates: Candidates of every cell as bitmasks, as returned by `Propagator` (those
+                of `Puzzle.get_candidates` if not given).
 
         Returns:
             Puzzle with one cell estimated.
         """
-        guesses = []
-        for empty_index in puzzle.get_empty_indices():
-            options = puzzle.get_options(empty_index)
-            if len(options) > 1:
-                guesses.append((empty_index, options))
-
-        # find puzzle index with smallest number of possibilities
-        min_options = min(len(options) for _, options in guesses)
-        index, options = next(
-            (i, opts) for i, opts in guesses if len(opts) == min_options
-        )
+        if candidates is None:
+            candidates = [puzzle.get_candidates(index) for index in range(puzzle.total)]
+        index = self.brancher.select(puzzle, candidates)
+        # options are popped from the end of the list
+        options = self.brancher.order(puzzle, candidates, index)[::-1]
+
+        # no need for a checkpoint if the cell is forced (when naked singles aren't filled)
+        if len(options) == 1:
+            puzzle[index] = options[0]
+            return puzzle
 
         # save checkpoint
         puzzle = self.checkpointer.stash(puzzle, index, options)
+        self._record_guess(puzzle, index)
         return puzzle
 
     def restore(self) -> Tuple[Puzzle, Dict[int, List[int]], bool]:
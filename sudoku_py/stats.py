@@ -0,0 +1,82 @@
+"""Counters and timings recorded by the solver during a search."""
+from typing import Any, Dict, List, NamedTuple
+
+from .puzzle import Puzzle
+
+PHASES = ("propagation", "branching", "backtracking")
+
+
+class SolveStats:
+    """Statistics of a single search, see `Solver.solve`.
+
+    Attributes:
+        loops: Number of solver loops (nodes tried by the "dlx" backend).
+        sweeps: Number of passes of a deduction rule over the puzzle.
+        guesses: Number of checkpoints created to guess the value of a cell.
+        backtracks: Number of times the search returned to a checkpoint.
+        restarts: Number of times the search started over from the input puzzle (see the
+            `restarts` argument of `Solver`).
+        max_depth: Largest number of checkpoints open at once.
+        solutions: Number of solutions found.
+        cached: Whether the solutions were taken from the solver's cache without searching.
+        filled: Number of cells filled by each deduction rule.
+        times: Seconds spent in each phase of the search (see `PHASES`), the "dlx" backend has no
+            propagation and records all of its search as branching.
+    """
+
+    def __init__(self):
+        self.loops = 0
+        self.sweeps = 0
+        self.guesses = 0
+        self.backtracks = 0
+        self.restarts = 0
+        self.max_depth = 0
+        self.solutions = 0
+        self.cached = False
+        self.filled: Dict[str, int] = {}
+        self.times: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+
+    def __str__(self) -> str:
+        return (
+            f"SolveStats[loops={self.loops}, guesses={self.guesses}, "
+            f"backtracks={self.backtracks}, max_depth={self.max_depth}, "
+            f"time={1000 * self.total_time:.3f}ms]"
+        )
+
+    @property
+    def total_time(self) -> float:
+        """Seconds spent searching, over all phases."""
+        return sum(self.times.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the statistics as a dictionary (e.g. to log or write as JSON)."""
+        return {
+            "loops": self.loops,
+            "sweeps": self.sweeps,
+            "guesses": self.guesses,
+            "backtracks": self.backtracks,
+            "restarts": self.restarts,
+            "max_depth": self.max_depth,
+            "solutions": self.solutions,
+            "cached": self.cached,
+            "filled": dict(self.filled),
+            "times": dict(self.times),
+            "total_time": self.total_time,
+        }
+
+
+class SolveResult(NamedTuple):
+    """Solutions found by `Solver.solve`, with the statistics of the search."""
+
+    solutions: List[Puzzle]
+    stats: SolveStats
+    exhausted: bool
+
+    @property
+    def status(self) -> str:
+        """Outcome of the search: "exhausted" if a budget of the solver ran out before the
+        requested number of solutions was found (the solutions are then only part of them),
+        otherwise "solved" if a solution was found, or "unsolvable" if the puzzle has none."""
+        if self.exhausted:
+            return "exhausted"
+        return "solved" if self.solutions else "unsolvable"
@@ -0,0 +1,100 @@
+"""Index tables shared by every puzzle of the same order."""
+from typing import Dict, NamedTuple, Tuple
+
+
+class PeerTables(NamedTuple):
+    """Precomputed cell/unit index tables for puzzles of a given order.
+
+    Units are numbered rows first, then columns, then blocks, so unit `u` of a puzzle with
+    `size` cells per unit is row `u`, column `u - size` or block `u - 2 * size`.
+
+    Attributes:
+        order: Order of the puzzles these tables describe.
+        size: Number of cells in a row, column, or block.
+        total: Number of cells in the puzzle.
+        units: Cell indices of every unit.
+        cell_units: Row, column, and block numbers of every cell.
+        peers: Indices of the cells sharing a unit with each cell (excluding the cell itself).
+        intersections: For every block and row/column that overlap, the cells in both, the other
+            cells of the block, and the other cells of the row/column.
+    """
+
+    order: int
+    size: int
+    total: int
+    units: Tuple[Tuple[int, ...], ...]
+    cell_units: Tuple[Tuple[int, int, int], ...]
+    peers: Tuple[Tuple[int, ...], ...]
+    intersections: Tuple[Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]], ...]
+
+    @property
+    def rows(self) -> Tuple[Tuple[int, ...], ...]:
+        return self.units[: self.size]
+
+    @property
+    def cols(self) -> Tuple[Tuple[int, ...], ...]:
+        return self.units[self.size : 2 * self.size]
+
+    @property
+    def blocks(self) -> Tuple[Tuple[int, ...], ...]:
+        return self.units[2 * self.size :]
+
+
+_PEER_TABLES: Dict[int, PeerTables] = {}
+
+
+def get_peer_tables(order: int) -> PeerTables:
+    """Get the index tables for puzzles of the given order, building them on first use."""
+    tables = _PEER_TABLES.get(order)
+    if tables is None:
+        tables = _PEER_TABLES[order] = _build_peer_tables(order)
+    return tables
+
+
+def _build_peer_tables(order: int) -> PeerTables:
+    size = order**2
+    total = size**2
+
+    cell_units = []
+    for index in range(total):
+        row, col = divmod(index, size)
+        cell_units.append((row, col, (row // order) * order + col // order))
+
+    rows = [[] for _ in range(size)]
+    cols = [[] for _ in range(size)]
+    blocks = [[] for _ in range(size)]
+    for index, (row, col, block) in enumerate(cell_units):
+        rows[row].append(index)
+        cols[col].append(index)
+        blocks[block].append(index)
+    units = tuple(tuple(unit) for unit in rows + cols + blocks)
+
+    peers = []
+    for index, (row, col, block) in enumerate(cell_units):
+        cells = set(rows[row]) | set(cols[col]) | set(blocks[block])
+        cells.discard(index)
+        peers.append(tuple(sorted(cells)))
+
+    intersections = []
+    for block in blocks:
+        block_rows = sorted(set(cell_units[i][0] for i in block))
+        block_cols = sorted(set(cell_units[i][1] for i in block))
+        for line in [rows[row] for row in block_rows] + [cols[col] for col in block_cols]:
+            overlap = set(block) & set(line)
+            intersections.append(
+                (
+                    tuple(sorted(overlap)),
+                    tuple(i for i in block if i not in overlap),
+                    tuple(i for i in line if i not in overlap),
+                )
+            )
+
+    return PeerTables(
+        order=order,
+        size=size,
+        total=total,
+        units=units,
+        cell_units=tuple(cell_units),
+        peers=tuple(peers),
+        intersections=tuple(intersections),
+    )
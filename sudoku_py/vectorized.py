@@ -0,0 +1,273 @@
+"""Vectorised candidate computation and singles propagation for batches of puzzles.
+
+Requires numpy (`pip install sudoku_py[numpy]`).
+"""
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .puzzle import Puzzle, _LINE_DIGITS
+from .solver import Solver
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            "`sudoku_py.vectorized` requires numpy, install it with `pip install sudoku_py[numpy]`."
+        )
+
+
+class PuzzleBatch:
+    """Puzzles of the same order stored together as an `(n_puzzles, size, size)` array.
+
+    Mirrors `Puzzle.get_candidates` and `Solver.fill_singles` for every puzzle of the batch at
+    once, so that puzzles solved by propagation alone never go through per-cell Python loops.
+    Candidates are bitmasks as in `Puzzle` (bit `v - 1` set if `v` is an option).
+    """
+
+    def __init__(self, grids: "np.ndarray"):
+        """Constructor.
+
+        Args:
+            grids: Integer array of shape `(n_puzzles, size, size)`, 0 marks an empty cell.
+        """
+        _require_numpy()
+        grids = np.asarray(grids)
+        assert grids.ndim == 3 and grids.shape[1] == grids.shape[2], "Expected (n, size, size)."
+        self.size = grids.shape[1]
+        self.order = int(round(self.size**0.5))
+        assert self.order**2 == self.size, "Puzzle size must be a square number."
+
+        self.grids = grids.astype(np.int8 if self.size < 128 else np.int16)
+        self.invalid = np.zeros(len(grids), dtype=bool)
+
+        if self.size <= 16:
+            self._mask_dtype = np.uint16
+        elif self.size <= 32:
+            self._mask_dtype = np.uint32
+        else:
+            self._mask_dtype = np.uint64
+        self._full = self._mask_dtype((1 << self.size) - 1)
+
+    @classmethod
+    def from_puzzles(cls, puzzles: Sequence[Puzzle]) -> "PuzzleBatch":
+        """Stack puzzles of the same order into a batch."""
+        _require_numpy()
+        size = len(puzzles[0])
+        return cls(np.array([puzzle.data for puzzle in puzzles]).reshape(-1, size, size))
+
+    def __len__(self) -> int:
+        return len(self.grids)
+
+    def to_puzzles(self) -> List[Puzzle]:
+        """Get every puzzle of the batch as a `Puzzle` (invalid puzzles are left out)."""
+        return [
+            Puzzle.from_trusted(grid.ravel().tolist())
+            for grid, invalid in zip(self.grids, self.invalid)
+            if not invalid
+        ]
+
+    @property
+    def solved(self) -> "np.ndarray":
+        """Boolean array flagging the puzzles without empty cells."""
+        return ~self.invalid & (self.grids != 0).all(axis=(1, 2))
+
+    def get_candidates(self) -> "np.ndarray":
+        """Get the options of every cell of every puzzle.
+
+        Returns:
+            Array of shape `(n_puzzles, size, size)` with the candidate bitmask of every cell
+            (0 for filled cells).
+        """
+        used = [np.bitwise_or.reduce(unit, axis=2) for unit in self._units(self._value_bits())]
+        return (self._full & ~self._spread(used)) * (self.grids == 0)
+
+    def fill_singles(
+        self,
+        rules: Sequence[str] = ("naked_singles", "hidden_singles"),
+        max_sweeps: Optional[int] = None,
+    ) -> "PuzzleBatch":
+        """Fill cells forced by naked and/or hidden singles in every puzzle, in place.
+
+        Each sweep fills every single of every puzzle at once. Puzzles where a cell or a value in
+        a unit is left without options, or where two singles clash, are flagged in `invalid`
+        and left unchanged from then on.
+
+        Args:
+            rules: Any of "naked_singles" and "hidden_singles".
+            max_sweeps: Maximum number of sweeps (until nothing changes if None).
+
+        Returns:
+            The batch itself.
+        """
+        for rule in rules:
+            assert rule in ["naked_singles", "hidden_singles"], f"Unsupported rule {rule}."
+
+        sweep = 0
+        while max_sweeps is None or sweep < max_sweeps:
+            sweep += 1
+            active = ~self.invalid & (self.grids == 0).any(axis=(1, 2))
+            if not active.any():
+                break
+
+            value_bits = self._value_bits()
+            placed = [np.bitwise_or.reduce(unit, axis=2) for unit in self._units(value_bits)]
+            candidates = (self._full & ~self._spread(placed)) * (self.grids == 0)
+            dead = ((self.grids == 0) & (candidates == 0)).any(axis=(1, 2))
+
+            forced = np.zeros_like(candidates)
+            if "naked_singles" in rules:
+                forced |= candidates * ((candidates & (candidates - 1)) == 0)
+            if "hidden_singles" in rules:
+                hidden = []
+                for unit, unit_placed in zip(self._units(candidates), placed):
+                    once, twice = self._once_twice(unit)
+                    dead |= ((once | unit_placed) != self._full).any(axis=1)
+                    hidden.append(once & ~twice)
+                forced |= candidates & self._spread(hidden)
+
+            # Two different values forced into one cell
+            dead |= ((forced & (forced - 1)) != 0).any(axis=(1, 2))
+
+            self.invalid |= dead & active
+            update = (forced != 0) & (active & ~self.invalid)[:, None, None]
+            if not update.any():
+                break
+
+            values = np.log2(forced[update].astype(np.float64)).astype(self.grids.dtype) + 1
+            self.grids[update] = values
+            self.invalid |= self._has_duplicates()
+
+        return self
+
+    def _value_bits(self) -> "np.ndarray":
+        """Bit of the value of every cell, 0 for empty cells."""
+        grids = self.grids.astype(self._mask_dtype)
+        one = self._mask_dtype(1)
+        return (one << np.maximum(grids, one) - one) * (grids != 0)
+
+    def _units(self, cells: "np.ndarray") -> List["np.ndarray"]:
+        """Rearrange `(n, size, size)` cells into rows, columns, and blocks, each of shape
+        `(n, unit, position in unit)`."""
+        n, order, size = len(cells), self.order, self.size
+        blocks = cells.reshape(n, order, order, order, order).transpose(0, 1, 3, 2, 4)
+        return [cells, cells.transpose(0, 2, 1), blocks.reshape(n, size, size)]
+
+    def _spread(self, per_unit: Sequence["np.ndarray"]) -> "np.ndarray":
+        """Combine `(n, size)` row, column, and block masks into the mask of every cell."""
+        rows, cols, blocks = per_unit
+        order = self.order
+        blocks = blocks.reshape(-1, order, order)
+        blocks = np.repeat(np.repeat(blocks, order, axis=1), order, axis=2)
+        return rows[:, :, None] | cols[:, None, :] | blocks
+
+    @staticmethod
+    def _once_twice(units: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        """Bits set in at least one and at least two positions of every unit."""
+        once = np.zeros(units.shape[:2], dtype=units.dtype)
+        twice = np.zeros_like(once)
+        for position in range(units.shape[2]):
+            bits = units[:, :, position]
+            twice |= once & bits
+            once |= bits
+        return once, twice
+
+    def _has_duplicates(self) -> "np.ndarray":
+        """Flag puzzles with a value repeated in a row, column, or block."""
+        duplicates = np.zeros(len(self.grids), dtype=bool)
+        for unit in self._units(self._value_bits()):
+            _, twice = self._once_twice(unit)
+            duplicates |= (twice != 0).any(axis=1)
+        return duplicates
+
+
+def solve_puzzles(
+    puzzles: Sequence[Puzzle],
+    solver: Optional[Solver] = None,
+    rules: Sequence[str] = ("naked_singles", "hidden_singles"),
+) -> Iterator[Tuple[str, Optional[Puzzle]]]:
+    """Solve puzzles of the same order with a vectorised propagation pre-pass.
+
+    Puzzles left unsolved by propagation are passed on to the scalar solver.
+
+    Args:
+        puzzles: Valid puzzles of the same order.
+        solver: Solver for puzzles that need searching (default settings if not given).
+        rules: Singles rules for the vectorised pre-pass.
+
+    Yields:
+        (status, solution) pairs in input order, where status is "solved", "unsolvable", or
+        "exhausted" (a budget of the solver ran out) and solution is None unless solved.
+    """
+    if len(puzzles) == 0:
+        return
+
+    batch = PuzzleBatch.from_puzzles(puzzles)
+    yield from _solve_batch(batch, solver or Solver(), rules)
+
+
+def solve_lines(
+    lines: Iterable[str],
+    solver: Optional[Solver] = None,
+    rules: Sequence[str] = ("naked_singles", "hidden_singles"),
+) -> List[Tuple[str, str]]:
+    """Solve puzzles written one per line, see `batch.solve_line` for the output format.
+
+    Lines are parsed and validated as arrays, grouped by puzzle order, without building a
+    `Puzzle` unless the puzzle needs searching after the vectorised pre-pass.
+    """
+    solver = solver or Solver()
+    lines = list(lines)
+    results = [("invalid", line) for line in lines]
+    groups = {}
+    for line_index, line in enumerate(lines):
+        cells = line.strip()
+        order = int(round(len(cells) ** 0.25))
+        if order >= 2 and order**4 == len(cells) and order**2 < len(_LINE_DIGITS):
+            groups.setdefault(order, []).append(line_index)
+
+    for order, indices in groups.items():
+        size = order**2
+        digits = np.array([list(lines[i].strip().upper()) for i in indices]).reshape(-1, size, size)
+        grids = np.full(digits.shape, -1, dtype=np.int16)
+        grids[digits == "."] = 0
+        for value in range(size + 1):
+            grids[digits == _LINE_DIGITS[value]] = value
+
+        # Unknown characters, values above the puzzle size, and repeated values are invalid
+        malformed = (grids < 0).any(axis=(1, 2))
+        batch = PuzzleBatch(np.maximum(grids, 0))
+        malformed |= batch._has_duplicates()
+        batch.invalid |= malformed
+
+        outcomes = _solve_batch(batch, solver, rules)
+        for line_index, is_malformed, (status, solution) in zip(indices, malformed, outcomes):
+            if not is_malformed:
+                line = solution.to_line() if solution is not None else lines[line_index]
+                results[line_index] = (status, line)
+
+    return results
+
+
+def _solve_batch(
+    batch: PuzzleBatch,
+    solver: Solver,
+    rules: Sequence[str],
+) -> Iterator[Tuple[str, Optional[Puzzle]]]:
+    batch.fill_singles(rules=rules)
+    solved = batch.solved
+    for index, grid in enumerate(batch.grids):
+        if batch.invalid[index]:
+            yield "unsolvable", None
+            continue
+
+        puzzle = Puzzle.from_trusted(grid.ravel().tolist())
+        if solved[index]:
+            yield "solved", puzzle
+            continue
+
+        result = solver.solve(puzzle)
+        yield result.status, (result.solutions[0] if result.solutions else None)